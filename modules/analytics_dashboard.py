@@ -1,16 +1,47 @@
-import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
 from dash import html, dcc
 import dash_bootstrap_components as dbc
 import random
 import numpy as np
+from modules.route_engine import component_summary, isolated_locations
+from modules.repository import read_table
+
+# Rows shown in the isolated-locations report
+ISOLATED_ROWS = 50
 
 # Load locations data
 def load_locations():
-    df = pd.read_csv("data/locations.csv")
+    df = read_table("locations")
     return df
 
+def connectivity_card():
+    # Data-quality report from the route graph's component index
+    summary = component_summary()
+    isolated = isolated_locations()
+    body = [html.P(
+        f"{summary['full']['components']} connected component(s), the largest with {summary['full']['largest']} locations; "
+        f"step-free: {summary['accessible']['components']} component(s), the largest with {summary['accessible']['largest']} locations.",
+        className="text-muted"
+    )]
+
+    if isolated.empty:
+        body.append(dbc.Alert("Every location is connected to the main route network.", color="success", className="mb-0"))
+    else:
+        header = html.Thead(html.Tr([html.Th("Location"), html.Th("Issue"), html.Th("Reachable Locations")]))
+        rows = [
+            html.Tr([html.Td(r.location), html.Td(r.issue), html.Td(r.component_size)])
+            for r in isolated.head(ISOLATED_ROWS).itertuples()
+        ]
+        body.append(dbc.Table([header, html.Tbody(rows)], bordered=True, hover=True, striped=True, responsive=True, size="sm", className="mb-0"))
+        if len(isolated) > ISOLATED_ROWS:
+            body.append(html.Small(f"Showing {ISOLATED_ROWS} of {len(isolated)} isolated locations.", className="text-muted"))
+
+    return dbc.Card([
+        dbc.CardHeader(f"Isolated Locations ({len(isolated)})", className="bg-danger text-white fw-bold"),
+        dbc.CardBody(body)
+    ], className="mb-4 shadow")
+
 def reports_layout():
     df = load_locations()
 
@@ -64,7 +95,7 @@ def reports_layout():
     )
 
     # Pie Chart: Percentage of visits by building - MOVED DOWN
-    building_visits = df.groupby('building')['visits'].sum().reset_index()
+    building_visits = df.groupby('building', observed=True)['visits'].sum().reset_index()
     pie_fig = px.pie(
         building_visits, 
         values='visits', 
@@ -189,6 +220,11 @@ def reports_layout():
                     dbc.CardBody(dcc.Graph(figure=heatmap_fig, config={'displayModeBar': False}))
                 ], className="mb-4 shadow")
             ], md=6)
+        ]),
+
+        # Route network data quality
+        dbc.Row([
+            dbc.Col([connectivity_card()], md=12)
         ])
     ])
 
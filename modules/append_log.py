@@ -0,0 +1,110 @@
+import os
+import json
+import threading
+
+# Append-only change log kept next to a CSV table (data/notification.csv ->
+# data/notification.log.jsonl). Each line is one JSON record:
+#
+#   {"op": "insert", "id": 12, "values": {...the full row...}}
+#   {"op": "update", "id": 7, "values": {...changed columns only...}}
+#   {"op": "delete", "id": 3}
+#
+# so adding, editing or deleting a row is a single short append instead of
+# rewriting the table. Readers fold the log into a per-row change index
+# (id -> merged values, or a tombstone for deleted rows), reading only the
+# bytes appended since their last look. Once the log passes a size
+# threshold it is compacted: the merged table is written back to the CSV
+# and the log starts over.
+
+LOG_COMPACT_BYTES = 1 << 20
+
+class AppendLog:
+
+    def __init__(self, path, compact_bytes=LOG_COMPACT_BYTES):
+        self.path = path
+        self.compact_bytes = compact_bytes
+        # Held around appends and compaction, and by readers folding in
+        # new records
+        self.lock = threading.RLock()
+        self._base = None
+        self._inode = None
+        self._offset = 0
+        self._changes = {}
+        self.max_id = 0
+
+    def append(self, records):
+        # Returns the log size after the append
+        data = "".join(json.dumps(record) + "\n" for record in records).encode("utf-8")
+        with self.lock:
+            with open(self.path, "ab") as f:
+                f.write(data)
+                return f.tell()
+
+    def changes(self, base=None):
+        # {str(id): None for a tombstone, or (full, values)} where full says
+        # the row was inserted through the log and values is the complete
+        # row; otherwise values only holds the columns changed on a row of
+        # the CSV. base identifies the CSV the log applies to; when it
+        # changes (a compaction, possibly in another process) the index is
+        # rebuilt from the start of the log. Replaying records the CSV
+        # already contains is harmless: inserts replace the row by id and
+        # updates and deletes are idempotent.
+        with self.lock:
+            return dict(self.refresh(base))
+
+    def refresh(self, base=None):
+        # Fold in new records and return the live index; hold self.lock
+        # while using it
+        with self.lock:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                self._reset(base, None)
+                return self._changes
+            if base != self._base or st.st_ino != self._inode or st.st_size < self._offset:
+                self._reset(base, st.st_ino)
+            if st.st_size > self._offset:
+                with open(self.path, "rb") as f:
+                    f.seek(self._offset)
+                    data = f.read(st.st_size - self._offset)
+                # A record still being written has no newline yet
+                end = data.rfind(b"\n") + 1
+                for line in data[:end].splitlines():
+                    if line.strip():
+                        self._apply(json.loads(line))
+                self._offset += end
+            return self._changes
+
+    def _reset(self, base, inode):
+        self._base, self._inode, self._offset, self._changes, self.max_id = base, inode, 0, {}, 0
+
+    def _apply(self, record):
+        key, op = str(record["id"]), record["op"]
+        if isinstance(record["id"], int):
+            self.max_id = max(self.max_id, record["id"])
+        if op == "delete":
+            self._changes[key] = None
+        elif op == "insert":
+            self._changes[key] = (True, dict(record["values"]))
+        elif key not in self._changes:
+            self._changes[key] = (False, dict(record["values"]))
+        elif self._changes[key] is not None:
+            full, values = self._changes[key]
+            self._changes[key] = (full, {**values, **record["values"]})
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def needs_compaction(self):
+        return self.size() > self.compact_bytes
+
+    def clear(self):
+        with self.lock:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self._reset(None, None)
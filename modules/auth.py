@@ -1,12 +1,11 @@
-import csv
 from dash import html
 import dash_bootstrap_components as dbc
 from dash.dependencies import Input, Output, State
+from modules.repository import read_records
 
 
 def load_user_database():
-    with open("data/users.csv", newline="", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
+    return read_records("users")
 
 
 def login_layout():
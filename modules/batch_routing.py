@@ -0,0 +1,200 @@
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from modules.route_engine import ACCESSIBLE, get_route_graph, shortest_path_tree
+
+# Many-to-many routing for whole timetables. Pairs are grouped by origin so
+# each origin costs one shortest-path tree however many destinations it
+# has; origins are spread over a process pool that receives the compact
+# graph once per worker. Results come back as DataFrame chunks (grouped by
+# origin, with pair_id pointing at the input row) or go straight to Parquet.
+#
+# From the command line:
+#   python -m modules.batch_routing pairs.csv routes_out.parquet [--accessible]
+
+# Origins handed to a worker per task, and rows per yielded chunk
+ORIGINS_PER_TASK = 64
+BATCH_CHUNK_ROWS = 100_000
+
+RESULT_COLUMNS = ["pair_id", "origin", "destination", "distance_m", "segments", "inaccessible_segments"]
+
+# ---------------- Input ----------------
+def _as_pairs(pairs):
+    # A DataFrame with origin/destination (or start_location/end_location)
+    # columns, or any iterable of (origin, destination) tuples
+    if isinstance(pairs, pd.DataFrame):
+        if {"origin", "destination"} <= set(pairs.columns):
+            df = pairs[["origin", "destination"]]
+        else:
+            df = pairs[["start_location", "end_location"]].set_axis(["origin", "destination"], axis=1)
+    else:
+        df = pd.DataFrame(list(pairs), columns=["origin", "destination"])
+    df = df.astype(str)
+    df.insert(0, "pair_id", df.index)
+    return df.reset_index(drop=True)
+
+def _origin_tasks(pairs):
+    groups = pairs.groupby("origin", sort=False).indices
+    batch = []
+    for origin, rows in groups.items():
+        batch.append((origin, pairs["pair_id"].to_numpy()[rows], pairs["destination"].to_numpy()[rows]))
+        if len(batch) == ORIGINS_PER_TASK:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# ---------------- Worker ----------------
+_worker_graph = None
+_worker_paths = False
+
+def _init_worker(graph, with_paths):
+    global _worker_graph, _worker_paths
+    _worker_graph = graph
+    _worker_paths = with_paths
+
+def _route_rows(tasks):
+    graph, with_paths = _worker_graph, _worker_paths
+    out = {column: [] for column in RESULT_COLUMNS}
+    paths = []
+    for origin, pair_ids, destinations in tasks:
+        s = graph.index.get(origin)
+        wanted = [graph.index[t] for t in destinations if t in graph.index]
+        dist, pred = shortest_path_tree(graph, s, until=wanted) if s is not None else ({}, {})
+        # Per-node (segments, inaccessible segments) memo, filled by
+        # walking up the tree only as far as the first node already known
+        known = {s: (0, 0)}
+        for t_name in destinations:
+            t = graph.index.get(t_name)
+            d = dist.get(t) if t is not None else None
+            if d is None:
+                out["distance_m"].append(np.nan)
+                out["segments"].append(pd.NA)
+                out["inaccessible_segments"].append(pd.NA)
+                paths.append("")
+                continue
+            chain = []
+            v = t
+            while v not in known:
+                chain.append(v)
+                v = pred[v][0]
+            for c in reversed(chain):
+                u, e = pred[c]
+                hops, blocked = known[u]
+                known[c] = (hops + 1, blocked + (0 if graph.flags[e] & ACCESSIBLE else 1))
+            out["distance_m"].append(d)
+            out["segments"].append(known[t][0])
+            out["inaccessible_segments"].append(known[t][1])
+            if with_paths:
+                nodes = [t]
+                while nodes[-1] != s:
+                    nodes.append(pred[nodes[-1]][0])
+                paths.append(" → ".join(graph.names[v] for v in reversed(nodes)))
+        out["pair_id"].extend(pair_ids.tolist())
+        out["origin"].extend([origin] * len(destinations))
+        out["destination"].extend(destinations.tolist())
+
+    df = pd.DataFrame(out, columns=RESULT_COLUMNS)
+    df["distance_m"] = df["distance_m"].astype(np.float64)
+    df["segments"] = df["segments"].astype("Int64")
+    df["inaccessible_segments"] = df["inaccessible_segments"].astype("Int64")
+    if with_paths:
+        df["path"] = paths
+    return df
+
+# ---------------- Batch API ----------------
+def batch_routes(pairs, accessible_only=False, with_paths=False, workers=None, chunk_rows=BATCH_CHUNK_ROWS):
+    # Generator of result DataFrames of roughly chunk_rows rows each.
+    # Unknown locations and unreachable pairs get distance_m = NaN.
+    graph = get_route_graph(accessible_only)
+    tasks = _origin_tasks(_as_pairs(pairs))
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        _init_worker(graph, with_paths)
+        results = map(_route_rows, tasks)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(graph, with_paths))
+        results = _bounded_map(pool, tasks, 2 * workers)
+
+    pending, rows = [], 0
+    try:
+        for df in results:
+            pending.append(df)
+            rows += len(df)
+            if rows >= chunk_rows:
+                yield pd.concat(pending, ignore_index=True)
+                pending, rows = [], 0
+        if pending:
+            yield pd.concat(pending, ignore_index=True)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+def _bounded_map(pool, tasks, in_flight):
+    # Executor.map would submit every task up front and buffer all results;
+    # keep only a few tasks queued so memory stays flat on huge timetables
+    futures = deque()
+    for task in tasks:
+        futures.append(pool.submit(_route_rows, task))
+        if len(futures) >= in_flight:
+            yield futures.popleft().result()
+    while futures:
+        yield futures.popleft().result()
+
+def batch_routes_frame(pairs, **kwargs):
+    chunks = list(batch_routes(pairs, **kwargs))
+    if not chunks:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+    return pd.concat(chunks, ignore_index=True)
+
+def write_batch_parquet(pairs, path, **kwargs):
+    # Streams chunks into one Parquet file; pyarrow is only needed here
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet output requires pyarrow (pip install pyarrow)") from e
+
+    writer = None
+    rows = 0
+    try:
+        for chunk in batch_routes(pairs, **kwargs):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        pq.write_table(pa.Table.from_pandas(pd.DataFrame(columns=RESULT_COLUMNS), preserve_index=False), path)
+    return rows
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Shortest routes for a CSV of origin/destination pairs")
+    parser.add_argument("pairs", help="CSV with origin,destination (or start_location,end_location) columns")
+    parser.add_argument("output", help=".parquet or .csv")
+    parser.add_argument("--accessible", action="store_true", help="wheelchair-accessible segments only")
+    parser.add_argument("--paths", action="store_true", help="include the location sequence")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    options = {"accessible_only": args.accessible, "with_paths": args.paths, "workers": args.workers}
+    pairs = pd.read_csv(args.pairs)
+    if args.output.endswith(".parquet"):
+        rows = write_batch_parquet(pairs, args.output, **options)
+    else:
+        rows = 0
+        for i, chunk in enumerate(batch_routes(pairs, **options)):
+            chunk.to_csv(args.output, mode="w" if i == 0 else "a", header=i == 0, index=False)
+            rows += len(chunk)
+    print(f"{args.output}: {rows} routes", file=sys.stderr)
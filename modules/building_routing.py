@@ -0,0 +1,250 @@
+import heapq
+import threading
+import numpy as np
+import pandas as pd
+
+from modules.route_engine import (
+    ACCESSIBLE,
+    RouteGraph,
+    graph_change_key,
+    load_locations,
+    load_path_data,
+    pareto_routes,
+)
+
+# Building-aware routing. Locations from locations.csv are joined onto the
+# route graph by name; every building gets a stair core and a lift core per
+# floor, and each location is linked to the cores on its floor. Stairs are
+# never accessible, lifts always are, and the link between a location and
+# its cores is accessible only when the location itself is.
+#
+# Queries run on a two-level hierarchy: each building is a cell, and an
+# overlay keeps, per building, only its boundary locations (those with a
+# route leaving the building) joined by precomputed shortest within-building
+# distances. A search uses full detail inside the origin and destination
+# buildings and outdoors, and the overlay everywhere else.
+
+# Walking-equivalent metres
+CORE_ACCESS_M = 10.0    # from a location to the stairs/lift on its floor
+STAIR_FLIGHT_M = 15.0   # one floor up or down by stairs
+LIFT_RIDE_M = 5.0       # one floor by lift
+LIFT_WAIT_M = 30.0      # waiting for the lift, half charged on each lift link
+
+OUTDOORS = -1
+
+# ---------------- Floor Graph ----------------
+def core_name(building, kind, floor):
+    return f"{building} {kind}, floor {floor}"
+
+def floor_edges(locations):
+    # Returns (edges, buildings, floors): edges in the routes table layout
+    # and {location name: building} / {location name: floor} maps covering
+    # the generated cores too
+    locations = locations.dropna(subset=["name", "building", "floor"]).drop_duplicates("name")
+    floor = pd.to_numeric(locations["floor"], errors="coerce")
+    locations = locations.assign(floor=floor).dropna(subset=["floor"]).astype({"floor": int})
+    accessible = locations["accessible"].astype(str).str.lower() == "true"
+
+    edges, buildings, floors = [], {}, {}
+    for building, group in locations.groupby("building", observed=True):
+        building = str(building)
+        for f in range(group["floor"].min(), group["floor"].max() + 1):
+            for kind in ("stairs", "lift"):
+                buildings[core_name(building, kind, f)] = building
+                floors[core_name(building, kind, f)] = f
+            if f > group["floor"].min():
+                edges.append((core_name(building, "stairs", f - 1), core_name(building, "stairs", f), STAIR_FLIGHT_M, False))
+                edges.append((core_name(building, "lift", f - 1), core_name(building, "lift", f), LIFT_RIDE_M, True))
+        for name, f, ok in zip(group["name"].astype(str), group["floor"], accessible[group.index]):
+            buildings[name] = building
+            floors[name] = f
+            edges.append((name, core_name(building, "stairs", f), CORE_ACCESS_M, bool(ok)))
+            edges.append((name, core_name(building, "lift", f), CORE_ACCESS_M + LIFT_WAIT_M / 2, bool(ok)))
+
+    edges = pd.DataFrame(edges, columns=["start_location", "end_location", "distance_m", "accessible"])
+    edges.insert(0, "id", -1)
+    return edges, buildings, floors
+
+# ---------------- Cell Search ----------------
+def _cell_dijkstra(graph, cells, source, cell, targets=None):
+    # Dijkstra confined to one building; stops once all targets are settled
+    offsets, graph_targets, weights = graph.offsets, graph.targets, graph.weights
+    dist = {source: 0.0}
+    pred = {}
+    pq = [(0.0, source)]
+    remaining = set(targets) if targets is not None else None
+    inf = float('inf')
+
+    while pq:
+        d, u = heapq.heappop(pq)
+        if d > dist[u]:
+            continue
+        if remaining is not None:
+            remaining.discard(u)
+            if not remaining:
+                break
+        lo, hi = int(offsets[u]), int(offsets[u + 1])
+        for e, v, w in zip(range(lo, hi), graph_targets[lo:hi].tolist(), weights[lo:hi].tolist()):
+            if cells[v] != cell:
+                continue
+            nd = d + w
+            if nd < dist.get(v, inf):
+                dist[v] = nd
+                pred[v] = (u, e)
+                heapq.heappush(pq, (nd, v))
+    return dist, pred
+
+# ---------------- Router ----------------
+class BuildingRouter:
+    # Overlay edges live in their own CSR arrays over the same node ids.
+    # base_edge is the graph half-edge an overlay edge copies, or -1 for a
+    # within-building shortcut that is unpacked by a cell search.
+
+    def __init__(self, graph, cells):
+        self.graph = graph
+        self.cells = cells
+        n = len(graph)
+        src = np.repeat(np.arange(n), np.diff(graph.offsets))
+        crossing = (cells[src] != cells[graph.targets]) & (cells[src] != OUTDOORS)
+
+        o_src = [src[crossing]]
+        o_dst = [graph.targets[crossing].astype(np.int64)]
+        o_w = [graph.weights[crossing]]
+        o_base = [np.flatnonzero(crossing)]
+
+        boundary = pd.Series(np.unique(src[crossing]))
+        for cell, members in boundary.groupby(cells[boundary.to_numpy()]):
+            members = members.tolist()
+            for b in members:
+                dist, _ = _cell_dijkstra(graph, cells, b, cell, members)
+                reached = [(v, dist[v]) for v in members if v != b and v in dist]
+                o_src.append(np.full(len(reached), b))
+                o_dst.append(np.array([v for v, _ in reached], dtype=np.int64))
+                o_w.append(np.array([d for _, d in reached], dtype=np.float64))
+                o_base.append(np.full(len(reached), -1))
+
+        o_src = np.concatenate(o_src).astype(np.int64)
+        order = np.argsort(o_src, kind="stable")
+        self.offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(o_src, minlength=n), out=self.offsets[1:])
+        self.targets = np.concatenate(o_dst)[order].astype(np.int32)
+        self.weights = np.concatenate(o_w)[order]
+        self.base_edge = np.concatenate(o_base)[order].astype(np.int64)
+        self.num_boundary = len(boundary)
+        # Generated stair/lift nodes and, per graph half-edge, the number
+        # of floors it climbs or descends; both set by build()
+        self.cores = frozenset()
+        self.floor_changes = np.zeros(len(graph.targets), dtype=np.int32)
+
+    @classmethod
+    def build(cls, routes, locations, accessible_only=False):
+        edges, buildings, floors = floor_edges(locations)
+        graph = RouteGraph.from_frame(pd.concat([routes, edges], ignore_index=True))
+        if accessible_only:
+            graph = graph.accessible_subgraph()
+        codes = {b: i for i, b in enumerate(sorted(set(buildings.values())))}
+        cells = np.array([codes[buildings[name]] if name in buildings else OUTDOORS for name in graph.names], dtype=np.int32)
+        router = cls(graph, cells)
+        router.cores = frozenset(edges["end_location"]) - set(locations["name"].astype(str))
+        level = np.array([floors.get(name, np.nan) for name in graph.names], dtype=np.float64)
+        src = np.repeat(np.arange(len(graph)), np.diff(graph.offsets))
+        router.floor_changes = np.nan_to_num(np.abs(level[src] - level[graph.targets])).astype(np.int32)
+        return router
+
+    def __contains__(self, name):
+        return name in self.graph
+
+    def pareto_routes(self, start, end, stats=None):
+        # Shortcuts only keep distance, so this runs on the full graph
+        return pareto_routes(self.graph, start, end, self.floor_changes, stats=stats)
+
+    def building_of(self, name):
+        u = self.graph.index.get(name)
+        return None if u is None or self.cells[u] == OUTDOORS else int(self.cells[u])
+
+    def shortest_path(self, start, end, stats=None):
+        if stats is not None:
+            stats["settled"] = 0
+            stats["strategy"] = "building overlay"
+        graph, cells = self.graph, self.cells
+        if start not in graph or end not in graph:
+            return None, [], []
+        s, t = graph.index[start], graph.index[end]
+        if s == t:
+            return 0.0, [start], []
+
+        # Full detail outdoors and in the two end buildings, overlay elsewhere
+        detailed = {OUTDOORS, int(cells[s]), int(cells[t])}
+        dist = {s: 0.0}
+        pred = {}
+        pq = [(0.0, s)]
+        inf = float('inf')
+        settled = 0
+
+        while pq:
+            d, u = heapq.heappop(pq)
+            if d > dist[u]:
+                continue
+            settled += 1
+            if u == t:
+                break
+            overlay = int(cells[u]) not in detailed
+            csr = self if overlay else graph
+            lo, hi = int(csr.offsets[u]), int(csr.offsets[u + 1])
+            for e, v, w in zip(range(lo, hi), csr.targets[lo:hi].tolist(), csr.weights[lo:hi].tolist()):
+                nd = d + w
+                if nd < dist.get(v, inf):
+                    dist[v] = nd
+                    pred[v] = (u, e, overlay)
+                    heapq.heappush(pq, (nd, v))
+
+        if stats is not None:
+            stats["settled"] = settled
+        if t not in pred:
+            return None, [], []
+
+        hops = []
+        v = t
+        while v != s:
+            u, e, overlay = pred[v]
+            hops.append((u, v, e, overlay))
+            v = u
+
+        nodes, flags = [s], []
+        for u, v, e, overlay in reversed(hops):
+            if overlay and self.base_edge[e] < 0:
+                self._unpack(u, v, nodes, flags)
+                continue
+            base = int(self.base_edge[e]) if overlay else e
+            nodes.append(v)
+            flags.append(bool(graph.flags[base] & ACCESSIBLE))
+        return dist[t], [graph.names[u] for u in nodes], flags
+
+    def _unpack(self, u, v, nodes, flags):
+        _, pred = _cell_dijkstra(self.graph, self.cells, u, int(self.cells[u]), [v])
+        segment = []
+        while v != u:
+            p, e = pred[v]
+            segment.append((v, bool(self.graph.flags[e] & ACCESSIBLE)))
+            v = p
+        for node, accessible in reversed(segment):
+            nodes.append(node)
+            flags.append(accessible)
+
+# ---------------- Cache ----------------
+# Rebuilt from both CSVs whenever routes or locations change
+_router_lock = threading.Lock()
+_router_cache = {"key": None, "full": None, "accessible": None}
+
+def get_building_router(accessible_only=False):
+    key = graph_change_key()
+    with _router_lock:
+        if _router_cache["key"] != key:
+            routes, locations = load_path_data(), load_locations()
+            _router_cache["full"] = BuildingRouter.build(routes, locations)
+            _router_cache["accessible"] = BuildingRouter.build(routes, locations, accessible_only=True)
+            _router_cache["key"] = key
+        return _router_cache["accessible" if accessible_only else "full"]
+
+def building_locations():
+    return sorted(name for name in load_locations()["name"].dropna().astype(str).unique())
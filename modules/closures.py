@@ -0,0 +1,301 @@
+import heapq
+import threading
+from bisect import bisect_right
+from datetime import datetime
+import pandas as pd
+
+from modules.route_engine import (
+    WALKING_SPEED,
+    RouteGraph,
+    as_route,
+    graph_change_key,
+    load_locations,
+    load_path_data,
+    unwind_path,
+)
+from modules.building_routing import floor_edges
+from modules.repository import TABLES, read_table, table_key
+
+# Scheduled closures: buildings shut at night, corridors closed during
+# events. data/closures.csv holds one closure window per row:
+#
+#   id,target_type,target,start,end,days,reason
+#   1,building,Science,22:00,06:00,,Night lock-up
+#   2,route,17,2026-05-02 09:00,2026-05-02 17:00,,Open day
+#   3,location,Library,18:00,23:59,Sat-Sun,Weekend hours
+#
+# target_type is route (target = route id), location (target = name) or
+# building (every location of that building). start/end are either a time
+# of day, repeating on the given days (every day when blank; a window that
+# ends before it starts runs past midnight), or full date-times for a
+# one-off closure.
+#
+# The schedule is compiled once into sorted, merged intervals per route and
+# per location (seconds of the week for repeating windows, seconds since
+# the epoch for one-off ones), so asking whether something is closed at a
+# given moment, or how long until it reopens, is a bisect. The route graph
+# never changes when a window opens or closes; time-aware searches check
+# the schedule as they go.
+
+CLOSURES_DATA = TABLES["closures"].path
+CLOSURE_COLUMNS = TABLES["closures"].columns
+
+DAY_S = 24 * 3600
+WEEK_S = 7 * DAY_S
+DAY_NAMES = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+EPOCH = datetime(1970, 1, 1)
+
+# ---------------- Closure Data ----------------
+def load_closures():
+    # Typed by the closures schema (see repository.py); blank cells are NaN
+    return read_table("closures")
+
+def closures_change_key():
+    # Building closures are expanded to the building's locations
+    return table_key("closures"), table_key("locations")
+
+def _parse_days(text):
+    # "Mon-Fri", "Sat,Sun", "" or blank (every day) -> weekday numbers
+    text = "" if pd.isna(text) else str(text).strip().lower()
+    if not text:
+        return list(range(7))
+    days = []
+    for part in text.split(","):
+        first, _, last = part.strip().partition("-")
+        lo = DAY_NAMES.index(first.strip()[:3])
+        hi = DAY_NAMES.index(last.strip()[:3]) if last else lo
+        days.extend(range(lo, hi + 1) if lo <= hi else [*range(lo, 7), *range(0, hi + 1)])
+    return sorted(set(days))
+
+def _clock(text):
+    # Seconds since midnight for "HH:MM", None for anything else
+    parts = str(text).strip().split(":")
+    if len(parts) != 2 or not all(p.isdigit() for p in parts):
+        return None
+    return int(parts[0]) * 3600 + int(parts[1]) * 60
+
+def _weekly_windows(start, end, days):
+    # [lo, hi) in seconds of the week, split where they wrap past Sunday
+    windows = []
+    for day in days:
+        lo = day * DAY_S + start
+        hi = day * DAY_S + end + (DAY_S if end <= start else 0)
+        if hi <= WEEK_S:
+            windows.append((lo, hi))
+        else:
+            windows.extend([(lo, WEEK_S), (0, hi - WEEK_S)])
+    return windows
+
+def _seconds(when):
+    return (when - EPOCH).total_seconds()
+
+# ---------------- Interval Index ----------------
+class IntervalSet:
+    # Half-open intervals merged and sorted by start; membership is one
+    # bisect over the starts
+
+    def __init__(self, intervals):
+        self.starts, self.ends = [], []
+        for lo, hi in sorted(intervals):
+            if self.ends and lo <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], hi)
+            else:
+                self.starts.append(lo)
+                self.ends.append(hi)
+
+    def __contains__(self, x):
+        i = bisect_right(self.starts, x) - 1
+        return i >= 0 and x < self.ends[i]
+
+    def until_open(self, x):
+        # Distance from x to the end of the interval holding it, 0 outside
+        i = bisect_right(self.starts, x) - 1
+        return self.ends[i] - x if i >= 0 and x < self.ends[i] else 0.0
+
+    def __len__(self):
+        return len(self.starts)
+
+class ClosureSchedule:
+
+    def __init__(self, closures, locations=None):
+        buildings = {}
+        if locations is not None and len(locations):
+            named = locations.dropna(subset=["name", "building"])
+            for building, group in named.groupby(named["building"].astype(str)):
+                buildings[building] = group["name"].astype(str).tolist()
+
+        weekly, once = {}, {}
+        for row in closures.itertuples():
+            kind, target = str(row.target_type).strip().lower(), str(row.target).strip()
+            if kind == "route":
+                route_id = pd.to_numeric(target, errors="coerce")
+                keys = [("route", int(route_id))] if pd.notna(route_id) else []
+            elif kind == "building":
+                keys = [("location", name) for name in buildings.get(target, [])]
+            else:
+                keys = [("location", target)]
+
+            # Rows that cannot be read (unknown day names, unparseable
+            # dates) are skipped rather than failing every route query
+            start, end = _clock(row.start), _clock(row.end)
+            if start is not None and end is not None:
+                try:
+                    windows, store = _weekly_windows(start, end, _parse_days(row.days)), weekly
+                except ValueError:
+                    continue
+            else:
+                lo, hi = pd.to_datetime(row.start, errors="coerce"), pd.to_datetime(row.end, errors="coerce")
+                if pd.isna(lo) or pd.isna(hi):
+                    continue
+                windows, store = [(_seconds(lo.to_pydatetime()), _seconds(hi.to_pydatetime()))], once
+            for key in keys:
+                store.setdefault(key, []).extend(windows)
+
+        self._weekly = {key: IntervalSet(w) for key, w in weekly.items()}
+        self._once = {key: IntervalSet(w) for key, w in once.items()}
+
+    def __bool__(self):
+        return bool(self._weekly or self._once)
+
+    def closed(self, key, week_s, epoch_s):
+        # key is ("route", id) or ("location", name); week_s / epoch_s are
+        # the same moment as seconds of the week and since the epoch
+        weekly = self._weekly.get(key)
+        if weekly is not None and week_s in weekly:
+            return True
+        once = self._once.get(key)
+        return once is not None and epoch_s in once
+
+    def closed_at(self, key, when):
+        return self.closed(key, _week_seconds(when), _seconds(when))
+
+    def wait(self, key, week_s, epoch_s):
+        # Seconds from the given moment until key is open (0 when it is),
+        # or None when it never opens: closed around the clock every day
+        weekly, once = self._weekly.get(key), self._once.get(key)
+        if weekly is not None and weekly.until_open(0) >= WEEK_S:
+            return None
+        waited = 0.0
+        while True:
+            step = weekly.until_open((week_s + waited) % WEEK_S) if weekly is not None else 0.0
+            if not step and once is not None:
+                step = once.until_open(epoch_s + waited)
+            if not step:
+                return waited
+            waited += step
+
+def _week_seconds(when):
+    return when.weekday() * DAY_S + when.hour * 3600 + when.minute * 60 + when.second
+
+# ---------------- Time-Aware Search ----------------
+# A route can only be set off on while it is open, and a location only
+# entered while it is open; otherwise the walker waits where they are until
+# both are. Waiting is what makes the search correct: reaching a location
+# earlier then never means leaving it later, so the earliest arrival per
+# location is the only one worth keeping. Without it a later arrival, after
+# a closure ends, could be the only way on and would be pruned.
+
+def _departure_wait(schedule, route_key, location_key, travel, week_s, epoch_s):
+    # Seconds to wait before setting off on a route that takes travel
+    # seconds, or None when no moment within a week works
+    waited = 0.0
+    while waited <= WEEK_S:
+        step = schedule.wait(route_key, (week_s + waited) % WEEK_S, epoch_s + waited)
+        if step is None:
+            return None
+        arrival = waited + step + travel
+        closed = schedule.wait(location_key, (week_s + arrival) % WEEK_S, epoch_s + arrival)
+        if closed is None:
+            return None
+        if not step and not closed:
+            return waited
+        waited += step + closed
+    return None
+
+def shortest_path_at(graph, start, end, departure, schedule, speed=WALKING_SPEED, stats=None):
+    # Earliest-arrival Dijkstra over time since departure, with distance
+    # walked as the tie-break; arrival times follow from the distance at
+    # speed plus any waiting. Returns (dist, path, access_flags), dist being
+    # the distance walked; stats["wait_s"] is the total time spent waiting.
+    if stats is not None:
+        stats["settled"] = 0
+        stats["wait_s"] = 0.0
+        stats["strategy"] = "time-aware dijkstra"
+    if start not in graph or end not in graph:
+        return None, [], []
+    s, t = graph.index[start], graph.index[end]
+    if s == t:
+        return 0.0, [start], []
+    if not graph.connected(start, end):
+        return None, [], []
+
+    offsets, targets, weights, route_ids, names = graph.offsets, graph.targets, graph.weights, graph.route_ids, graph.names
+    week0, epoch0 = _week_seconds(departure), _seconds(departure)
+    best = {s: (0.0, 0.0)}
+    pred = {}
+    pq = [(0.0, 0.0, s)]
+    inf = (float('inf'), float('inf'))
+    settled = 0
+
+    while pq:
+        at, d, u = heapq.heappop(pq)
+        if (at, d) > best[u]:
+            continue
+        settled += 1
+        if u == t:
+            break
+        week_s, epoch_s = (week0 + at) % WEEK_S, epoch0 + at
+        lo, hi = int(offsets[u]), int(offsets[u + 1])
+        for e, v, w, rid in zip(range(lo, hi), targets[lo:hi].tolist(), weights[lo:hi].tolist(), route_ids[lo:hi].tolist()):
+            travel = w / speed
+            # Waiting only makes the arrival later
+            if (at + travel, d + w) >= best.get(v, inf):
+                continue
+            wait = _departure_wait(schedule, ("route", rid), ("location", names[v]), travel, week_s, epoch_s)
+            if wait is None:
+                continue
+            label = (at + wait + travel, d + w)
+            if label >= best.get(v, inf):
+                continue
+            best[v] = label
+            pred[v] = (u, e)
+            heapq.heappush(pq, (*label, v))
+
+    if stats is not None:
+        stats["settled"] = settled
+    if t not in pred:
+        return None, [], []
+    arrival, walked = best[t]
+    if stats is not None:
+        stats["wait_s"] = arrival - walked / speed
+    return as_route(graph, walked, *unwind_path(graph, pred, s, t))
+
+# ---------------- Cache ----------------
+# The schedule is recompiled when closures.csv or locations.csv changes.
+# Time-aware searches run on routes plus building floors without collapsing
+# parallel routes, since a closure may shut one of several parallel routes
+# and leave the others usable; that graph follows the route graph's key.
+_closures_lock = threading.Lock()
+_closures_cache = {"key": None, "schedule": None, "graph_key": None, "full": None, "accessible": None}
+
+def get_closure_schedule():
+    key = closures_change_key()
+    with _closures_lock:
+        if _closures_cache["key"] != key:
+            _closures_cache["schedule"] = ClosureSchedule(load_closures(), load_locations())
+            _closures_cache["key"] = key
+        return _closures_cache["schedule"]
+
+def get_timed_graph(accessible_only=False):
+    key = graph_change_key()
+    with _closures_lock:
+        if _closures_cache["graph_key"] != key:
+            edges, _, _ = floor_edges(load_locations())
+            graph = RouteGraph.from_frame(pd.concat([load_path_data(), edges], ignore_index=True), collapse=False)
+            _closures_cache["full"] = graph
+            _closures_cache["accessible"] = graph.accessible_subgraph()
+            _closures_cache["graph_key"] = key
+        return _closures_cache["accessible" if accessible_only else "full"]
+
+def route_at(start, end, departure, accessible_only=False, stats=None):
+    return shortest_path_at(get_timed_graph(accessible_only), start, end, departure, get_closure_schedule(), stats=stats)
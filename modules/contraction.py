@@ -0,0 +1,333 @@
+import os
+import heapq
+import threading
+import numpy as np
+
+from modules.route_engine import (
+    ACCESSIBLE,
+    PATH_DATA,
+    BackgroundRebuild,
+    get_route_graph,
+    on_routes_changed,
+    routes_change_key,
+    routes_fingerprint,
+    source_fingerprints,
+)
+from modules.storage import atomic_write
+
+# Contraction hierarchy over the route graph. Preprocessing contracts nodes
+# one at a time (least important first), adding shortcut edges so distances
+# between the remaining nodes are preserved. A query is then a bidirectional
+# Dijkstra that only ever climbs to higher-ranked nodes, which settles a few
+# dozen nodes even on large campuses.
+#
+# Build offline with:  python -m modules.contraction
+
+CH_PATH = os.path.splitext(PATH_DATA)[0] + ".ch.npz"
+CH_ACCESSIBLE_PATH = os.path.splitext(PATH_DATA)[0] + ".accessible.ch.npz"
+
+# Witness searches give up after this many settled nodes and keep the
+# shortcut; that only costs an unnecessary edge, never a wrong answer
+WITNESS_SETTLE_LIMIT = 500
+
+# ---------------- Preprocessing ----------------
+def _witness_distances(adj, source, excluded, limit):
+    dist = {source: 0.0}
+    pq = [(0.0, source)]
+    settled = 0
+    while pq:
+        d, u = heapq.heappop(pq)
+        if d > dist[u]:
+            continue
+        settled += 1
+        if settled > WITNESS_SETTLE_LIMIT:
+            break
+        for v, (w, _, _) in adj[u].items():
+            if v == excluded:
+                continue
+            nd = d + w
+            if nd <= limit and nd < dist.get(v, float('inf')):
+                dist[v] = nd
+                heapq.heappush(pq, (nd, v))
+    return dist
+
+def _needed_shortcuts(adj, v):
+    neighbours = list(adj[v].items())
+    shortcuts = []
+    for i, (a, (wa, _, _)) in enumerate(neighbours):
+        rest = neighbours[i + 1:]
+        if not rest:
+            break
+        limit = wa + max(wb for _, (wb, _, _) in rest)
+        dist = _witness_distances(adj, a, v, limit)
+        for b, (wb, _, _) in rest:
+            if dist.get(b, float('inf')) > wa + wb:
+                shortcuts.append((a, b, wa + wb))
+    return shortcuts
+
+def _initial_adjacency(graph):
+    # Undirected simple graph: the cheapest edge per pair (preferring the
+    # accessible one on ties). Entries are (weight, middle node, flags) and
+    # middle is -1 for an original route.
+    adj = [dict() for _ in range(len(graph))]
+    for u in range(len(graph)):
+        for e, v, w in graph.edges_from(u):
+            if u == v:
+                continue
+            flags = int(graph.flags[e])
+            cur = adj[u].get(v)
+            if cur is None or w < cur[0] or (w == cur[0] and flags & ACCESSIBLE and not cur[2] & ACCESSIBLE):
+                adj[u][v] = (w, -1, flags)
+    return adj
+
+# ---------------- Hierarchy ----------------
+class ContractionHierarchy:
+    # Upward graph in CSR layout: up-edges of node u (towards higher-ranked
+    # nodes) are targets/weights/middles/flags[offsets[u]:offsets[u + 1]]
+
+    def __init__(self, names, rank, offsets, targets, weights, middles, flags, fingerprint=""):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.rank = rank
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.middles = middles
+        self.flags = flags
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def build(cls, graph, fingerprint=""):
+        n = len(graph)
+        adj = _initial_adjacency(graph)
+        deleted = [0] * n
+        rank = np.full(n, -1, dtype=np.int32)
+        up = [None] * n
+
+        # Priority: edge difference plus already-contracted neighbours,
+        # which spreads contraction evenly across the graph
+        pq = [(len(_needed_shortcuts(adj, v)) - len(adj[v]), v) for v in range(n)]
+        heapq.heapify(pq)
+        next_rank = 0
+
+        while pq:
+            _, v = heapq.heappop(pq)
+            if rank[v] >= 0:
+                continue
+            # Lazy update: re-evaluate and put back if no longer the minimum
+            shortcuts = _needed_shortcuts(adj, v)
+            p = len(shortcuts) - len(adj[v]) + deleted[v]
+            if pq and p > pq[0][0]:
+                heapq.heappush(pq, (p, v))
+                continue
+
+            for a, b, w in shortcuts:
+                cur = adj[a].get(b)
+                if cur is None or w < cur[0]:
+                    adj[a][b] = (w, v, 0)
+                    adj[b][a] = (w, v, 0)
+
+            up[v] = list(adj[v].items())
+            for u in adj[v]:
+                del adj[u][v]
+                deleted[u] += 1
+            adj[v] = {}
+            rank[v] = next_rank
+            next_rank += 1
+
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(edges) for edges in up], out=offsets[1:])
+        edges = [edge for node_edges in up for edge in node_edges]
+        return cls(
+            graph.names,
+            rank,
+            offsets,
+            np.array([v for v, _ in edges], dtype=np.int32),
+            np.array([w for _, (w, _, _) in edges], dtype=np.float64),
+            np.array([m for _, (_, m, _) in edges], dtype=np.int32),
+            np.array([f for _, (_, _, f) in edges], dtype=np.uint8),
+            fingerprint,
+        )
+
+    @property
+    def num_shortcuts(self):
+        return int((self.middles >= 0).sum())
+
+    # ---------------- Persistence ----------------
+    def save(self, path):
+        atomic_write(path, lambda f: np.savez(
+            f,
+            names=np.array(self.names, dtype=str),
+            rank=self.rank,
+            offsets=self.offsets,
+            targets=self.targets,
+            weights=self.weights,
+            middles=self.middles,
+            flags=self.flags,
+            fingerprint=np.array(self.fingerprint),
+        ))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(
+                data["names"].tolist(),
+                data["rank"],
+                data["offsets"],
+                data["targets"],
+                data["weights"],
+                data["middles"],
+                data["flags"],
+                str(data["fingerprint"]),
+            )
+
+    # ---------------- Query ----------------
+    def _up_edges(self, u):
+        lo, hi = int(self.offsets[u]), int(self.offsets[u + 1])
+        return zip(range(lo, hi), self.targets[lo:hi].tolist(), self.weights[lo:hi].tolist())
+
+    def _edge_between(self, a, b):
+        low, high = (a, b) if self.rank[a] < self.rank[b] else (b, a)
+        for e, v, _ in self._up_edges(low):
+            if v == high:
+                return e
+        raise KeyError((a, b))
+
+    def _unpack(self, a, b, e, nodes, flags):
+        # Expand a (possibly nested) shortcut a-b into original segments
+        stack = [(a, b, e)]
+        while stack:
+            a, b, e = stack.pop()
+            m = int(self.middles[e])
+            if m < 0:
+                nodes.append(b)
+                flags.append(bool(self.flags[e] & ACCESSIBLE))
+                continue
+            stack.append((m, b, self._edge_between(m, b)))
+            stack.append((a, m, self._edge_between(a, m)))
+
+    def shortest_path(self, start, end, stats=None):
+        if stats is not None:
+            stats["settled"] = 0
+            stats["strategy"] = "contraction hierarchy"
+        if start not in self.index or end not in self.index:
+            return None, [], []
+        s, t = self.index[start], self.index[end]
+        if s == t:
+            return 0.0, [start], []
+
+        inf = float('inf')
+        dist = ({s: 0.0}, {t: 0.0})
+        pred = ({}, {})
+        pq = ([(0.0, s)], [(0.0, t)])
+        best, meet = inf, None
+        settled = 0
+
+        while True:
+            live = [side for side in (0, 1) if pq[side] and pq[side][0][0] < best]
+            if not live:
+                break
+            side = min(live, key=lambda i: pq[i][0][0])
+            d, u = heapq.heappop(pq[side])
+            if d > dist[side][u]:
+                continue
+            settled += 1
+
+            other = dist[1 - side]
+            if u in other and d + other[u] < best:
+                best, meet = d + other[u], u
+
+            # Stall-on-demand: if a higher node already reached by this
+            # search offers a shorter way to u, u is not on a shortest
+            # up-path and its edges need not be relaxed
+            edges = list(self._up_edges(u))
+            if any(dist[side].get(v, inf) + w < d for _, v, w in edges):
+                continue
+
+            for e, v, w in edges:
+                nd = d + w
+                if nd < dist[side].get(v, inf):
+                    dist[side][v] = nd
+                    pred[side][v] = (u, e)
+                    heapq.heappush(pq[side], (nd, v))
+
+        if stats is not None:
+            stats["settled"] = settled
+        if meet is None:
+            return None, [], []
+
+        # Up-chains s -> meet and t -> meet, then unpack every edge
+        chains = []
+        for side, origin in ((0, s), (1, t)):
+            chain = []
+            v = meet
+            while v != origin:
+                u, e = pred[side][v]
+                chain.append((u, v, e))
+                v = u
+            chains.append(chain)
+
+        nodes, flags = [s], []
+        for u, v, e in reversed(chains[0]):
+            self._unpack(u, v, e, nodes, flags)
+        for u, v, e in chains[1]:
+            self._unpack(v, u, e, nodes, flags)
+
+        return best, [self.names[u] for u in nodes], flags
+
+# ---------------- Cache / Background Rebuild ----------------
+# Hierarchies are loaded from disk when their fingerprint matches the
+# current routes table. Any route change starts a rebuild in a
+# background thread; until it lands, get_hierarchy() returns None and
+# callers fall back to a plain graph search. Single-route edits rebuild too:
+# a changed edge can invalidate shortcuts anywhere above it in the order.
+_ch_lock = threading.Lock()
+_ch_cache = {"key": None, "full": None, "accessible": None}
+
+CH_STATS = {"loads": 0, "builds": 0}
+
+def _load_if_fresh(path, fingerprint):
+    if not os.path.exists(path):
+        return None
+    try:
+        ch = ContractionHierarchy.load(path)
+    except (OSError, ValueError, KeyError):
+        return None
+    return ch if ch.fingerprint == fingerprint else None
+
+def get_hierarchy(accessible_only=False):
+    key = routes_change_key()
+    with _ch_lock:
+        if _ch_cache["key"] != key:
+            fingerprint = routes_fingerprint()
+            _ch_cache["key"] = key
+            _ch_cache["full"] = _load_if_fresh(CH_PATH, fingerprint)
+            _ch_cache["accessible"] = _load_if_fresh(CH_ACCESSIBLE_PATH, fingerprint)
+            loaded = [ch for ch in (_ch_cache["full"], _ch_cache["accessible"]) if ch is not None]
+            CH_STATS["loads"] += len(loaded)
+            if len(loaded) < 2:
+                schedule_rebuild()
+        return _ch_cache["accessible" if accessible_only else "full"]
+
+def rebuild_hierarchies():
+    graph = get_route_graph()
+    fingerprints = source_fingerprints(graph.source_key)
+    if fingerprints is None:
+        # The tables changed after the graph was fetched; start over
+        schedule_rebuild()
+        return
+    fingerprint = fingerprints[0]
+    for subgraph, path in ((graph, CH_PATH), (graph.accessible_subgraph(), CH_ACCESSIBLE_PATH)):
+        ContractionHierarchy.build(subgraph, fingerprint).save(path)
+        CH_STATS["builds"] += 1
+    with _ch_lock:
+        _ch_cache["key"] = None
+
+schedule_rebuild = BackgroundRebuild("ch-rebuild", rebuild_hierarchies)
+on_routes_changed(schedule_rebuild)
+
+if __name__ == "__main__":
+    rebuild_hierarchies()
+    for path in (CH_PATH, CH_ACCESSIBLE_PATH):
+        ch = ContractionHierarchy.load(path)
+        print(f"{path}: {len(ch.names)} nodes, {len(ch.targets)} up-edges, {ch.num_shortcuts} shortcuts")
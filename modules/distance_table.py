@@ -0,0 +1,412 @@
+import os
+import glob
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from modules.route_engine import (
+    ACCESSIBLE,
+    PATH_DATA,
+    BackgroundRebuild,
+    get_route_graph,
+    on_routes_changed,
+    routes_change_key,
+    routes_fingerprint,
+    shortest_path_tree,
+    source_fingerprints,
+)
+from modules.storage import atomic_write
+
+# All-pairs shortest distances for small/medium campuses. An n x n distance
+# matrix and a next-hop matrix are filled once (vectorized Floyd-Warshall
+# for small graphs, one Dijkstra tree per source on a process pool above
+# that), so a route lookup is a walk of len(path) table reads. The
+# matrices are plain .npy files opened with mmap_mode="r": every worker
+# process maps the same pages instead of holding its own copy.
+#
+# Build offline with:  python -m modules.distance_table
+
+# Above this many locations the O(n^3) build and n^2 storage stop paying
+# off and the hierarchy/graph search is used instead
+DISTANCE_TABLE_MAX_NODES = 3000
+
+# Floyd-Warshall is n passes over the whole matrix; past a few hundred
+# locations n sparse Dijkstra trees are far cheaper
+FLOYD_WARSHALL_MAX_NODES = 500
+
+TABLE_PREFIX = os.path.splitext(PATH_DATA)[0] + ".apsp"
+TABLE_ACCESSIBLE_PREFIX = os.path.splitext(PATH_DATA)[0] + ".accessible.apsp"
+TABLE_PARTS = ("names", "dist", "next", "flags")
+
+# ---------------- Build ----------------
+def _direct_edges(graph):
+    # Cheapest edge per ordered pair (accessible first on ties) as matrices
+    n = len(graph)
+    src = np.repeat(np.arange(n), np.diff(graph.offsets))
+    dst = graph.targets.astype(np.int64)
+    accessible = (graph.flags & ACCESSIBLE) != 0
+
+    dist = np.full((n, n), np.inf)
+    nxt = np.full((n, n), -1, dtype=np.int32)
+    flags = np.zeros((n, n), dtype=np.uint8)
+
+    key = src * n + dst
+    order = np.lexsort((~accessible, graph.weights, key))
+    _, first = np.unique(key[order], return_index=True)
+    best = order[first]
+    dist[src[best], dst[best]] = graph.weights[best]
+    nxt[src[best], dst[best]] = dst[best]
+    flags[src[best], dst[best]] = graph.flags[best]
+
+    diagonal = np.arange(n)
+    dist[diagonal, diagonal] = 0.0
+    nxt[diagonal, diagonal] = diagonal
+    return dist, nxt, flags
+
+def floyd_warshall(graph):
+    dist, nxt, flags = _direct_edges(graph)
+    for k in range(len(graph)):
+        via = dist[:, k, None] + dist[None, k, :]
+        better = via < dist
+        np.copyto(dist, via, where=better)
+        np.copyto(nxt, np.broadcast_to(nxt[:, k, None], nxt.shape), where=better)
+    return dist, nxt, flags
+
+_worker_graph = None
+
+def _init_worker(graph):
+    global _worker_graph
+    _worker_graph = graph
+
+def _tree_rows(sources, graph=None):
+    graph = graph if graph is not None else _worker_graph
+    n = len(graph)
+    dist_rows = np.full((len(sources), n), np.inf)
+    next_rows = np.full((len(sources), n), -1, dtype=np.int32)
+    for row, s in enumerate(sources):
+        dist, pred = shortest_path_tree(graph, s)
+        first_hop = {s: s}
+        for v in dist:
+            # Walk up the tree until a node with a known first hop
+            chain = []
+            while v not in first_hop:
+                chain.append(v)
+                u = pred[v][0]
+                if u == s:
+                    first_hop[v] = v
+                    chain.pop()
+                    break
+                v = u
+            for c in reversed(chain):
+                first_hop[c] = first_hop[pred[c][0]]
+        targets = np.fromiter(dist.keys(), dtype=np.int64, count=len(dist))
+        dist_rows[row, targets] = np.fromiter(dist.values(), dtype=np.float64, count=len(dist))
+        next_rows[row, targets] = [first_hop[v] for v in dist]
+    return sources, dist_rows, next_rows
+
+def repeated_dijkstra(graph, workers=None):
+    n = len(graph)
+    _, _, flags = _direct_edges(graph)
+    dist = np.full((n, n), np.inf)
+    nxt = np.full((n, n), -1, dtype=np.int32)
+
+    workers = workers or os.cpu_count() or 1
+    chunks = [list(range(i, n, workers * 4)) for i in range(min(n, workers * 4))]
+    if workers == 1:
+        _init_worker(graph)
+        results = map(_tree_rows, chunks)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(graph,))
+        results = pool.map(_tree_rows, chunks)
+    try:
+        for sources, dist_rows, next_rows in results:
+            dist[sources] = dist_rows
+            nxt[sources] = next_rows
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return dist, nxt, flags
+
+def _relax_edge(dist, nxt, u, v, w):
+    # Shortest paths after edge u-v got cheaper (or appeared): each entry is
+    # either unchanged or now runs s ... u - v ... t (or the reverse)
+    for x, y in ((u, v), (v, u)):
+        via = dist[:, x, None] + w + dist[None, y, :]
+        better = via < dist
+        first = nxt[:, x].copy()
+        first[x] = y
+        np.copyto(dist, via, where=better)
+        np.copyto(nxt, np.broadcast_to(first[:, None], nxt.shape), where=better)
+
+def _sources_through(dist, u, v, w):
+    # Sources with at least one shortest path over edge u-v of weight w.
+    # The comparison is loose on purpose: an extra source only costs one
+    # Dijkstra tree, a missed one would leave a stale row.
+    reach = np.flatnonzero(np.isfinite(dist[:, u]))
+    block = dist[np.ix_(reach, reach)]
+    du, dv = dist[reach, u], dist[reach, v]
+    limit = block * (1 + 1e-9) + 1e-9
+    through = (du[:, None] + w + dv[None, :] <= limit) | (dv[:, None] + w + du[None, :] <= limit)
+    return reach[through.any(axis=1)]
+
+# ---------------- Table ----------------
+class DistanceTable:
+
+    def __init__(self, names, dist, nxt, flags, fingerprint=""):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.dist = dist
+        self.next = nxt
+        self.flags = flags
+        self.fingerprint = fingerprint
+        # Source key of the route graph a repaired table was derived from
+        self.source_key = None
+
+    @classmethod
+    def build(cls, graph, fingerprint="", workers=None):
+        if len(graph) <= FLOYD_WARSHALL_MAX_NODES:
+            dist, nxt, flags = floyd_warshall(graph)
+        else:
+            dist, nxt, flags = repeated_dijkstra(graph, workers)
+        return cls(graph.names, dist, nxt, flags, fingerprint)
+
+    def save(self, prefix):
+        # Files carry the fingerprint in their name, so a worker that has the
+        # previous generation mapped keeps a consistent set until it reloads
+        tag = self.fingerprint[:16]
+        arrays = {
+            "names": np.array(self.names, dtype=str),
+            "dist": self.dist,
+            "next": self.next,
+            "flags": self.flags,
+        }
+        for part, array in arrays.items():
+            atomic_write(f"{prefix}.{tag}.{part}.npy", lambda f: np.save(f, array))
+
+        for path in glob.glob(f"{glob.escape(prefix)}.*.npy"):
+            if not os.path.basename(path).startswith(os.path.basename(f"{prefix}.{tag}.")):
+                os.remove(path)
+
+    @classmethod
+    def load(cls, prefix, fingerprint):
+        tag = fingerprint[:16]
+        paths = {part: f"{prefix}.{tag}.{part}.npy" for part in TABLE_PARTS}
+        if not all(os.path.exists(path) for path in paths.values()):
+            return None
+        return cls(
+            np.load(paths["names"]).tolist(),
+            np.load(paths["dist"], mmap_mode="r"),
+            np.load(paths["next"], mmap_mode="r"),
+            np.load(paths["flags"], mmap_mode="r"),
+            fingerprint,
+        )
+
+    # ---------------- Incremental Repair ----------------
+    def repair(self, graph, updates):
+        # New in-memory table for graph, given the per-pair changes from
+        # route_engine.apply_route_change: (a, b, (weight, flags) before,
+        # (weight, flags) after). A cheaper edge is relaxed into every entry
+        # in one O(n^2) pass; a dearer or removed edge only re-runs Dijkstra
+        # from the sources whose shortest paths went through it. Returns
+        # None when graph is not a superset of the table's locations.
+        old = len(self.names)
+        if graph.names[:old] != self.names:
+            return None
+        n = len(graph)
+        dist = np.full((n, n), np.inf)
+        nxt = np.full((n, n), -1, dtype=np.int32)
+        flags = np.zeros((n, n), dtype=np.uint8)
+        dist[:old, :old] = self.dist
+        nxt[:old, :old] = self.next
+        flags[:old, :old] = self.flags
+        added = np.arange(old, n)
+        dist[added, added] = 0.0
+        nxt[added, added] = added
+
+        for a, b, (before, _), (after, after_flags) in updates:
+            u, v = graph.index[a], graph.index[b]
+            flags[u, v] = flags[v, u] = after_flags
+            if after < before:
+                _relax_edge(dist, nxt, u, v, after)
+            elif after > before:
+                sources = _sources_through(dist, u, v, before)
+                if len(sources):
+                    _, dist_rows, next_rows = _tree_rows(sources.tolist(), graph)
+                    dist[sources] = dist_rows
+                    nxt[sources] = next_rows
+        table = DistanceTable(graph.names, dist, nxt, flags)
+        table.source_key = graph.source_key
+        return table
+
+    def distance(self, start, end):
+        if start not in self.index or end not in self.index:
+            return None
+        d = float(self.dist[self.index[start], self.index[end]])
+        return d if d != float('inf') else None
+
+    def within(self, start, max_dist, stats=None):
+        # Same answer as route_engine.reachable_within, from one table row
+        if stats is not None:
+            stats["settled"] = 0
+            stats["strategy"] = "distance table"
+        if start not in self.index or max_dist < 0:
+            return []
+        row = np.asarray(self.dist[self.index[start]])
+        hits = np.flatnonzero(row <= max_dist)
+        hits = hits[np.argsort(row[hits], kind="stable")]
+        return [(self.names[v], float(row[v])) for v in hits]
+
+    def shortest_path(self, start, end, stats=None):
+        if stats is not None:
+            stats["settled"] = 0
+            stats["strategy"] = "distance table"
+        d = self.distance(start, end)
+        if d is None:
+            return None, [], []
+
+        t = self.index[end]
+        u = self.index[start]
+        nodes, access_flags = [u], []
+        while u != t:
+            v = int(self.next[u, t])
+            access_flags.append(bool(self.flags[u, v] & ACCESSIBLE))
+            nodes.append(v)
+            u = v
+        if stats is not None:
+            stats["settled"] = len(nodes)
+        return d, [self.names[u] for u in nodes], access_flags
+
+# ---------------- Cache / Background Rebuild ----------------
+# A single-route edit (route_engine.apply_route_change) that only makes
+# edges cheaper is relaxed into the tables in memory right away, and the
+# result is written to disk in the background. Repairs run inside the
+# edit's callback, which holds the routes table lock, so an edit that makes
+# an edge dearer or removes one (re-running Dijkstra from every source
+# whose paths used it) is repaired by the background thread instead;
+# until then there are no tables, and queries fall back to the hierarchy
+# or a graph search as they do while tables are missing. Any other change
+# schedules a full rebuild.
+_table_lock = threading.Lock()
+_table_cache = {"key": None, "full": None, "accessible": None, "dirty": False, "pending": None}
+
+TABLE_STATS = {"loads": 0, "builds": 0, "repairs": 0}
+
+def get_distance_table(accessible_only=False):
+    key = routes_change_key()
+    with _table_lock:
+        if _table_cache["key"] != key:
+            fingerprint = routes_fingerprint()
+            _table_cache["key"] = key
+            _table_cache["dirty"] = False
+            _table_cache["pending"] = None
+            _table_cache["full"] = DistanceTable.load(TABLE_PREFIX, fingerprint)
+            _table_cache["accessible"] = DistanceTable.load(TABLE_ACCESSIBLE_PREFIX, fingerprint)
+            loaded = [t for t in (_table_cache["full"], _table_cache["accessible"]) if t is not None]
+            TABLE_STATS["loads"] += len(loaded)
+            if len(loaded) < 2 and len(get_route_graph()) <= DISTANCE_TABLE_MAX_NODES:
+                schedule_rebuild()
+        return _table_cache["accessible" if accessible_only else "full"]
+
+def _repair_pending(key, pending):
+    # Repair handed over by repair_tables; (full, accessible) once
+    # installed, None when it failed or another change came first
+    full, accessible, change = pending
+    full = full.repair(change["graph"], change["full"])
+    accessible = accessible.repair(change["accessible_graph"], change["accessible"])
+    if full is None or accessible is None:
+        return None
+    with _table_lock:
+        if _table_cache["key"] != key:
+            return None
+        _table_cache.update(full=full, accessible=accessible)
+        TABLE_STATS["repairs"] += 1
+    return full, accessible
+
+def rebuild_tables():
+    with _table_lock:
+        key = _table_cache["key"]
+        dirty = _table_cache["dirty"] and key == routes_change_key()
+        tables = _table_cache["full"], _table_cache["accessible"]
+        pending = _table_cache["pending"] if key == routes_change_key() else None
+        _table_cache["dirty"] = False
+        _table_cache["pending"] = None
+    if pending is not None:
+        repaired = _repair_pending(key, pending)
+        if repaired is not None:
+            dirty, tables = True, repaired
+    if dirty:
+        # Saved under the fingerprint of the routes the repaired tables
+        # were derived from; written since, they are rebuilt instead
+        fingerprints = source_fingerprints(tables[0].source_key)
+        if fingerprints is not None:
+            for table, prefix in zip(tables, (TABLE_PREFIX, TABLE_ACCESSIBLE_PREFIX)):
+                table.fingerprint = fingerprints[0]
+                table.save(prefix)
+            return
+
+    graph = get_route_graph()
+    if len(graph) > DISTANCE_TABLE_MAX_NODES:
+        return
+    fingerprints = source_fingerprints(graph.source_key)
+    if fingerprints is None:
+        # The tables changed after the graph was fetched; start over
+        schedule_rebuild()
+        return
+    fingerprint = fingerprints[0]
+    for subgraph, prefix in ((graph, TABLE_PREFIX), (graph.accessible_subgraph(), TABLE_ACCESSIBLE_PREFIX)):
+        DistanceTable.build(subgraph, fingerprint).save(prefix)
+        TABLE_STATS["builds"] += 1
+    with _table_lock:
+        _table_cache["key"] = None
+
+def repair_tables(version, change=None):
+    with _table_lock:
+        key = _table_cache["key"]
+        full, accessible = _table_cache["full"], _table_cache["accessible"]
+        # Only a table built from exactly the routes table this change was
+        # written over (same table key, previous version) can be repaired;
+        # anything else (including a burst of edits racing each other, here
+        # or in another process) goes through a rebuild
+        current = (
+            change is not None
+            and key == (change["base_key"], version - 1)
+            and full is not None
+            and accessible is not None
+        )
+        if current:
+            key = change["routes_key"], version
+            if len(change["graph"]) > DISTANCE_TABLE_MAX_NODES:
+                _table_cache.update(key=key, full=None, accessible=None, dirty=False, pending=None)
+                return
+            if not _cheaper_only(change):
+                _table_cache.update(key=key, full=None, accessible=None, dirty=False, pending=(full, accessible, change))
+                schedule_rebuild()
+                return
+            full = full.repair(change["graph"], change["full"])
+            accessible = accessible.repair(change["accessible_graph"], change["accessible"])
+            if full is not None and accessible is not None:
+                _table_cache.update(key=key, full=full, accessible=accessible, dirty=True, pending=None)
+                TABLE_STATS["repairs"] += 1
+                schedule_rebuild()
+                return
+        _table_cache["key"] = None
+        _table_cache["pending"] = None
+    schedule_rebuild()
+
+def _cheaper_only(change):
+    # True when no location pair got a dearer best edge (or lost its
+    # edges); those are repaired with one O(n^2) relaxation pass each
+    return all(after[0] <= before[0] for _, _, before, after in change["full"] + change["accessible"])
+
+schedule_rebuild = BackgroundRebuild("distance-table-rebuild", rebuild_tables)
+on_routes_changed(repair_tables)
+
+if __name__ == "__main__":
+    rebuild_tables()
+    for prefix in (TABLE_PREFIX, TABLE_ACCESSIBLE_PREFIX):
+        table = DistanceTable.load(prefix, routes_fingerprint())
+        if table is None:
+            print(f"{prefix}: skipped (more than {DISTANCE_TABLE_MAX_NODES} locations)")
+        else:
+            print(f"{prefix}: {len(table.names)} locations, {table.dist.nbytes / 2**20:.1f} MiB")
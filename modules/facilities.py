@@ -0,0 +1,160 @@
+import heapq
+import threading
+import numpy as np
+
+from modules.route_engine import (
+    ACCESSIBLE,
+    BackgroundRebuild,
+    graph_change_key,
+    load_locations,
+    nearest_target,
+    on_routes_changed,
+)
+from modules.building_routing import get_building_router
+
+# "Nearest cafeteria / toilet / exit" queries. Locations carry a category
+# in locations.csv; for every category one multi-source Dijkstra from all
+# of its locations at once gives each node its nearest facility and the
+# next hop towards it, so a query is a walk of len(path) array reads. The
+# index is rebuilt in the background when routes or locations change;
+# until it is ready, queries run a multi-target search that stops at the
+# first facility it settles.
+
+LOCATION_CATEGORIES = [
+    "cafeteria",
+    "toilet",
+    "exit",
+    "library",
+    "lecture hall",
+    "lab",
+    "office",
+    "medical",
+    "parking",
+]
+
+# ---------------- Facilities ----------------
+def facilities_by_category(locations, accessible_only=False):
+    # {category: [location name]}; accessible_only keeps only locations
+    # that are themselves wheelchair accessible
+    if "category" not in locations.columns:
+        return {}
+    locations = locations.dropna(subset=["name", "category"])
+    if accessible_only:
+        locations = locations[locations["accessible"].astype(str).str.lower() == "true"]
+    category = locations["category"].astype(str).str.strip().str.lower()
+    locations = locations[category != ""].assign(category=category)
+    return {c: group["name"].astype(str).tolist() for c, group in locations.groupby("category")}
+
+def facility_categories():
+    return sorted(facilities_by_category(load_locations()))
+
+# ---------------- Index ----------------
+def _nearest_source_tree(graph, sources):
+    # Multi-source Dijkstra: for every node the distance to its nearest
+    # source, the (node, half-edge) one hop closer to it, and which source
+    n = len(graph)
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    dist = np.full(n, np.inf)
+    parent = np.full(n, -1, dtype=np.int32)
+    parent_edge = np.full(n, -1, dtype=np.int64)
+    root = np.full(n, -1, dtype=np.int32)
+
+    best = {s: 0.0 for s in sources}
+    pq = [(0.0, s) for s in best]
+    heapq.heapify(pq)
+    owner = {s: s for s in best}
+    hop = {}
+    inf = float('inf')
+    while pq:
+        d, u = heapq.heappop(pq)
+        if d > best[u]:
+            continue
+        lo, hi = int(offsets[u]), int(offsets[u + 1])
+        for e, v, w in zip(range(lo, hi), targets[lo:hi].tolist(), weights[lo:hi].tolist()):
+            nd = d + w
+            if nd < best.get(v, inf):
+                best[v] = nd
+                owner[v] = owner[u]
+                hop[v] = (u, e)
+                heapq.heappush(pq, (nd, v))
+
+    nodes = np.fromiter(best.keys(), dtype=np.int64, count=len(best))
+    dist[nodes] = np.fromiter(best.values(), dtype=np.float64, count=len(best))
+    root[nodes] = [owner[v] for v in best]
+    if hop:
+        reached = np.fromiter(hop.keys(), dtype=np.int64, count=len(hop))
+        parent[reached] = [u for u, _ in hop.values()]
+        parent_edge[reached] = [e for _, e in hop.values()]
+    return dist, parent, parent_edge, root
+
+class NearestFacilityIndex:
+
+    def __init__(self, graph, facilities):
+        self.graph = graph
+        self.trees = {}
+        for category, names in facilities.items():
+            sources = [graph.index[name] for name in names if name in graph.index]
+            if sources:
+                self.trees[category] = _nearest_source_tree(graph, sources)
+
+    def nearest(self, start, category, stats=None):
+        # (dist, path, access_flags, facility name), like nearest_target
+        if stats is not None:
+            stats["settled"] = 0
+            stats["strategy"] = "nearest-facility index"
+        graph = self.graph
+        tree = self.trees.get(category)
+        if tree is None or start not in graph:
+            return None, [], [], None
+        dist, parent, parent_edge, root = tree
+        u = graph.index[start]
+        if not np.isfinite(dist[u]):
+            return None, [], [], None
+
+        nodes, flags = [u], []
+        while parent[u] >= 0:
+            flags.append(bool(graph.flags[parent_edge[u]] & ACCESSIBLE))
+            u = int(parent[u])
+            nodes.append(u)
+        if stats is not None:
+            stats["settled"] = len(nodes)
+        return float(dist[nodes[0]]), [graph.names[v] for v in nodes], flags, graph.names[int(root[nodes[0]])]
+
+# ---------------- Cache / Background Rebuild ----------------
+_facility_lock = threading.Lock()
+_facility_cache = {"key": None, "full": None, "accessible": None}
+
+def get_facility_index(accessible_only=False):
+    # None while the index for the current routes/locations is being built
+    with _facility_lock:
+        if _facility_cache["key"] != graph_change_key():
+            schedule_rebuild()
+            return None
+        return _facility_cache["accessible" if accessible_only else "full"]
+
+def rebuild_facility_index():
+    key = graph_change_key()
+    with _facility_lock:
+        if _facility_cache["key"] == key:
+            return
+    locations = load_locations()
+    indexes = {
+        slot: NearestFacilityIndex(
+            get_building_router(accessible_only=slot == "accessible").graph,
+            facilities_by_category(locations, accessible_only=slot == "accessible"),
+        )
+        for slot in ("full", "accessible")
+    }
+    with _facility_lock:
+        _facility_cache.update(indexes, key=key)
+
+def nearest_facility(start, category, accessible_only=False, stats=None):
+    index = get_facility_index(accessible_only)
+    if index is not None:
+        return index.nearest(start, category, stats)
+    router = get_building_router(accessible_only)
+    targets = facilities_by_category(load_locations(), accessible_only).get(category, [])
+    return nearest_target(router.graph, start, targets, stats)
+
+schedule_rebuild = BackgroundRebuild("facility-index-rebuild", rebuild_facility_index)
+on_routes_changed(schedule_rebuild)
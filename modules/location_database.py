@@ -5,28 +5,29 @@ from dash import html, dcc, Input, Output, State
 from dash.dependencies import ALL
 from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
+from modules.facilities import LOCATION_CATEGORIES
+from modules.repository import TABLES, delete_row, get_row, insert_row, read_table, table_exists, update_row, write_table
 
 # ------------------ Config ------------------
-CSV_PATH = "data/locations.csv"
+CSV_PATH = TABLES["locations"].path
 os.makedirs("data", exist_ok=True)
 
-# ------------------ CSV Read / Write ------------------
+# ------------------ Read / Write ------------------
 def read_locations():
-    if os.path.exists(CSV_PATH):
-        df = pd.read_csv(CSV_PATH)
+    if table_exists("locations"):
+        df = read_table("locations")
 
-        # FIX boolean from CSV
-        df["accessible"] = df["accessible"].apply(
-            lambda x: True if str(x).lower() == "true" else False
-        )
+        if "category" not in df.columns:
+            df["category"] = ""
+        df["category"] = df["category"].fillna("")
 
         return df
 
-    return pd.DataFrame(columns=["id", "name", "building", "floor", "accessible"])
+    return pd.DataFrame(columns=["id", "name", "building", "floor", "accessible", "category"])
 
 
 def save_locations(df):
-    df.to_csv(CSV_PATH, index=False)
+    write_table("locations", df)
 
 # ------------------ Table ------------------
 def generate_locations_table(df):
@@ -45,6 +46,7 @@ def generate_locations_table(df):
         html.Th([html.I(className="fas fa-building me-2"), "Building"]),
         html.Th([html.I(className="fas fa-layer-group me-2"), "Floor"]),
         html.Th([html.I(className="fas fa-wheelchair me-2"), "Accessible"]),
+        html.Th([html.I(className="fas fa-tags me-2"), "Category"]),
         html.Th([html.I(className="fas fa-cogs me-2"), "Actions"]),
     ]), className="table-dark")
 
@@ -57,7 +59,7 @@ def generate_locations_table(df):
             html.Td(str(row.id), className="fw-semibold"),
             html.Td([
                 html.I(className="fas fa-map-pin text-primary me-2"),
-                html.Span(row.name, className="fw-medium")
+                html.Span(row["name"], className="fw-medium")
             ]),
             html.Td([
                 html.I(className="fas fa-building text-info me-2"),
@@ -71,6 +73,7 @@ def generate_locations_table(df):
                 html.I(className=f"{accessible_icon} me-2"),
                 html.Span(accessible_text, className="fw-semibold")
             ]),
+            html.Td(row.category.title() if row.category else "—", className="text-muted"),
             html.Td([
                 dbc.Button([
                     html.I(className="fas fa-edit me-1"),
@@ -208,6 +211,21 @@ def locations_layout():
                             style={"borderRadius": "8px", "color": "black"}
                         )
                     ], md=6),
+                ], className="mb-3"),
+
+                dbc.Row([
+                    dbc.Col([
+                        html.Label([
+                            html.I(className="fas fa-tags me-2 text-warning"),
+                            "Category (optional)"
+                        ], className="form-label fw-semibold"),
+                        dcc.Dropdown(
+                            id="loc-category",
+                            options=[{"label": c.title(), "value": c} for c in LOCATION_CATEGORIES],
+                            placeholder="e.g., Cafeteria, Toilet, Exit...",
+                            style={"borderRadius": "8px", "color": "black"}
+                        )
+                    ], md=6),
                 ], className="mb-4"),
 
                 dbc.Row([
@@ -256,11 +274,9 @@ def register_locations_callbacks(app):
         ctx = dash.callback_context
         loc_id = ctx.triggered_id["index"]
 
-        df = read_locations()
-        df = df[df.id != loc_id]
-        save_locations(df)
+        delete_row("locations", loc_id)
 
-        return generate_locations_table(df)
+        return generate_locations_table(read_locations())
 
     # ------------------ EDIT + RESET (SINGLE CALLBACK) ------------------
     @app.callback(
@@ -268,6 +284,7 @@ def register_locations_callbacks(app):
         Output("loc-building", "value"),
         Output("loc-floor", "value"),
         Output("loc-accessible", "value"),
+        Output("loc-category", "value"),
         Output("add-loc-btn", "children"),
         Output("edit-loc-id", "data"),
         Input({"type": "edit-loc", "index": ALL}, "n_clicks"),
@@ -284,18 +301,18 @@ def register_locations_callbacks(app):
 
         # -------- RESET --------
         if trigger == "reset-loc-btn.n_clicks":
-            return "", "", "", None, "Add", None
+            return "", "", "", None, None, "Add", None
 
         # -------- EDIT --------
         loc_id = ctx.triggered_id["index"]
-        df = read_locations()
-        row = df[df.id == loc_id].iloc[0]
+        row = get_row("locations", loc_id)
 
         return (
-            row.name,
-            row.building,
-            row.floor,
-            row.accessible,
+            row["name"],
+            row["building"],
+            row["floor"],
+            str(row["accessible"]).lower() == "true",
+            row.get("category") or None,
             "Update",
             loc_id
         )
@@ -308,31 +325,24 @@ def register_locations_callbacks(app):
         State("loc-building", "value"),
         State("loc-floor", "value"),
         State("loc-accessible", "value"),
+        State("loc-category", "value"),
         State("edit-loc-id", "data"),
         prevent_initial_call=True
     )
-    def save_location(_, name, building, floor, accessible, edit_id):
+    def save_location(_, name, building, floor, accessible, category, edit_id):
         if not name or not building or not floor or accessible is None:
             raise PreventUpdate
 
-        df = read_locations()
-
+        location = {
+            "name": name,
+            "building": building,
+            "floor": floor,
+            "accessible": accessible,
+            "category": category or ""
+        }
         if edit_id is not None:
-            df.loc[df.id == edit_id, ["name", "building", "floor", "accessible"]] = [
-                name, building, floor, accessible
-            ]
+            update_row("locations", edit_id, location)
         else:
-            new_id = int(df.id.max()) + 1 if not df.empty else 1
-            df = pd.concat([
-                df,
-                pd.DataFrame([{
-                    "id": new_id,
-                    "name": name,
-                    "building": building,
-                    "floor": floor,
-                    "accessible": accessible
-                }])
-            ], ignore_index=True)
-
-        save_locations(df)
-        return generate_locations_table(df)
+            insert_row("locations", location)
+
+        return generate_locations_table(read_locations())
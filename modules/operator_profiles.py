@@ -1,19 +1,19 @@
 from dash import html, dcc, Input, Output, State, ctx, ALL
 import dash_bootstrap_components as dbc
 import dash
-import csv
 import os
 import uuid
+from modules.repository import TABLES, delete_row, insert_row, read_records, table_exists, update_row, write_table
 
 # ---------------- ENSURE DATA FOLDER ----------------
 os.makedirs("data", exist_ok=True)
-CSV_PATH = "data/users.csv"
+CSV_PATH = TABLES["users"].path
 
-FIELDS = ["id", "username", "password", "full_name", "email", "role", "status"]
+FIELDS = TABLES["users"].columns
 
 # ---------------- READ USERS ----------------
 def read_users():
-    if not os.path.exists(CSV_PATH):
+    if not table_exists("users"):
         admin = [{
             "id": str(uuid.uuid4()),
             "username": "admin",
@@ -26,15 +26,11 @@ def read_users():
         write_users(admin)
         return admin
 
-    with open(CSV_PATH, "r", encoding="utf-8") as f:
-        return list(csv.DictReader(f))
+    return read_records("users")
 
 # ---------------- WRITE USERS ----------------
 def write_users(users):
-    with open(CSV_PATH, "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=FIELDS)
-        writer.writeheader()
-        writer.writerows(users)
+    write_table("users", users)
 
 # ---------------- LAYOUT ----------------
 def users_tab_layout():
@@ -180,7 +176,7 @@ def register_users_callbacks(app):
         # -------- SAVE USER --------
         if trig == "save-user-btn":
             if index is None:
-                users.append({
+                user = {
                     "id": str(uuid.uuid4()),
                     "username": username,
                     "password": password,
@@ -188,24 +184,27 @@ def register_users_callbacks(app):
                     "email": email,
                     "role": role,
                     "status": status
-                })
+                }
+                users.append(user)
+                insert_row("users", user)
             else:
                 u = users[index]
-                u.update({
+                changes = {
                     "full_name": fullname,
                     "email": email,
                     "role": role,
                     "status": status
-                })
+                }
                 if password:
-                    u["password"] = password
-            write_users(users)
+                    changes["password"] = password
+                u.update(changes)
+                update_row("users", u["id"], changes)
             return users, False, "", None, "", False, "", "", "", "student", "active"
 
         # -------- DELETE USER --------
         if isinstance(trig, dict) and trig.get("type") == "delete-user":
             users = [u for u in users if u["id"] != trig["id"]]
-            write_users(users)
+            delete_row("users", trig["id"])
             return users, False, "", None, "", False, "", "", "", "student", "active"
 
         # If no trigger (initial load), just return current data
@@ -1,74 +1,370 @@
-import os
+from datetime import datetime
 import dash
 from dash import html, dcc, Input, Output, State, callback_context
-import pandas as pd
 import dash_bootstrap_components as dbc
-import heapq
-from collections import defaultdict
+from modules.route_engine import (
+    ROUTE_RESULT_CACHE,
+    WALKING_SPEED,
+    LRUCache,
+    get_route_graph,
+    graph_change_key,
+    k_shortest_paths,
+    on_routes_changed,
+    reachable_within,
+    shortest_path,
+)
+from modules.building_routing import building_locations, get_building_router
+from modules.contraction import get_hierarchy
+from modules.facilities import facility_categories, nearest_facility
+from modules.distance_table import get_distance_table
+from modules.tour_optimizer import plan_tour
+from modules.closures import closures_change_key, get_timed_graph, route_at
 
 DARK_BLUE = "#1a237e"
 LIGHT_GREEN = "#4caf50"
 ORANGE = "#ff9800"
 
-PATH_DATA = "data/routes.csv"
-
-def load_path_data():
-    if os.path.exists(PATH_DATA):
-        df = pd.read_csv(PATH_DATA)
-        df["distance_m"] = pd.to_numeric(df["distance_m"], errors="coerce")
-        df["accessible"] = df["accessible"].astype(str).str.lower() == "true"
-        return df
-    return pd.DataFrame(columns=["id", "start_location", "end_location", "distance_m", "accessible"])
-
-def build_graph(df):
-    graph = defaultdict(list)
-    for _, row in df.iterrows():
-        start = row["start_location"]
-        end = row["end_location"]
-        dist = row["distance_m"]
-        accessible = row["accessible"]
-        # Add both directions since routes are bidirectional
-        graph[start].append((end, dist, accessible))
-        graph[end].append((start, dist, accessible))
-    return graph
-
-def dijkstra_shortest_path(graph, start, end):
-    if start not in graph or end not in graph:
-        return None, float('inf'), []
-
-    # Priority queue: (distance, node, path, accessibility_flags)
-    pq = [(0, start, [start], [])]
-    visited = set()
-    min_dist = {node: float('inf') for node in graph}
-    min_dist[start] = 0
-
-    while pq:
-        dist, current, path, access_flags = heapq.heappop(pq)
-
-        if current in visited:
-            continue
-        visited.add(current)
-
-        if current == end:
-            return dist, path, access_flags
-
-        for neighbor, edge_dist, accessible in graph[current]:
-            if neighbor in visited:
-                continue
-
-            new_dist = dist + edge_dist
-            if new_dist < min_dist[neighbor]:
-                min_dist[neighbor] = new_dist
-                new_path = path + [neighbor]
-                new_flags = access_flags + [accessible]
-                heapq.heappush(pq, (new_dist, neighbor, new_path, new_flags))
-
-    return None, float('inf'), []
+ALTERNATIVE_ROUTES = 3
+
+NEARBY_MINUTES = 5
+
+# Route options shown when comparing distance, steps and floor changes
+ROUTE_OPTIONS = 5
+
+# Stops accepted by the multi-stop tour planner
+TOUR_MAX_STOPS = 30
+
+def format_walking_time(dist):
+    walking_time_minutes = (dist / WALKING_SPEED) / 60
+    return f"{walking_time_minutes:.1f} minutes" if walking_time_minutes < 60 else f"{walking_time_minutes/60:.1f} hours"
+
+def alternatives_card(routes):
+    if not routes:
+        return dbc.Alert([
+            html.I(className="fas fa-info-circle me-2"),
+            "No alternative routes found for this journey."
+        ], color="info", className="mt-3")
+
+    items = []
+    for i, (dist, path, access_flags) in enumerate(routes, start=1):
+        blocked = access_flags.count(False)
+        access_text = "Fully Accessible" if not blocked else f"{blocked} inaccessible segment{'s' if blocked > 1 else ''}"
+        items.append(dbc.ListGroupItem([
+            html.Div([
+                html.Span(f"Option {i}", className="fw-bold me-3"),
+                html.Span(f"{dist:.0f} m", className="me-3"),
+                html.Span(f"~{format_walking_time(dist)}", className="me-3 text-muted"),
+                html.Span(access_text, style={"color": LIGHT_GREEN if not blocked else ORANGE}),
+            ], className="mb-1"),
+            html.Small(" → ".join(path), className="text-muted", style={"wordBreak": "break-word"})
+        ]))
+
+    return dbc.Card([
+        dbc.CardHeader([
+            html.I(className="fas fa-random me-2"),
+            "Alternative Routes"
+        ], className="bg-info text-white fw-bold"),
+        dbc.CardBody(dbc.ListGroup(items, flush=True))
+    ], className="mt-3 shadow")
+
+# ---------------- Route Query ----------------
+def find_route(origin, destination, accessible_only=False, alternatives=False, strategy="auto", departure=None):
+    # Returns (dist, path, access_flags, alternative_routes, search_stats);
+    # results are served from the LRU cache while the route table is unchanged.
+    # With a departure datetime, scheduled closures apply and the search is
+    # time-aware (no precomputed structure knows about closures).
+    accessible_only, alternatives, strategy = bool(accessible_only), bool(alternatives), strategy or "auto"
+    key = (origin, destination, accessible_only, alternatives, strategy, graph_change_key())
+    if departure is not None:
+        key = (*key, departure.replace(second=0, microsecond=0), closures_change_key())
+    cached = ROUTE_RESULT_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    if departure is not None:
+        search_stats = {}
+        dist, path, access_flags = route_at(origin, destination, departure, accessible_only, search_stats)
+        result = (dist, path, access_flags, [], search_stats)
+        ROUTE_RESULT_CACHE.put(key, result)
+        return result
+
+    # Accessible queries search the accessible-only view, so a longer
+    # step-free route is still found when the shortest one has stairs
+    graph = get_route_graph(accessible_only=accessible_only)
+
+    # Rooms that only exist in the locations table (no routes of their own)
+    # are reached through the building/floor graph
+    if strategy == "auto" and (origin not in graph or destination not in graph):
+        strategy = "building"
+
+    # Precomputed distance tables / hierarchy answer most queries; while
+    # they are being rebuilt after a route change, fall back to searching
+    # the graph
+    search_stats = {}
+    precomputed = None
+    if strategy == "building":
+        precomputed = get_building_router(accessible_only=accessible_only)
+        graph = precomputed.graph
+
+    # Locations in different components: "no route" from the component
+    # index, without a search that would exhaust the origin's component
+    if not graph.connected(origin, destination):
+        result = (None, [], [], [], {"settled": 0, "strategy": "component index"})
+        ROUTE_RESULT_CACHE.put(key, result)
+        return result
+
+    if strategy in ("auto", "table"):
+        precomputed = get_distance_table(accessible_only=accessible_only)
+    if precomputed is None and strategy in ("auto", "table", "ch"):
+        precomputed = get_hierarchy(accessible_only=accessible_only)
+    if precomputed is not None:
+        dist, path, access_flags = precomputed.shortest_path(origin, destination, search_stats)
+    else:
+        fallback = strategy if strategy in ("dijkstra", "bidirectional", "astar") else "auto"
+        dist, path, access_flags = shortest_path(graph, origin, destination, fallback, search_stats)
+
+    routes = []
+    if alternatives and dist is not None:
+        routes = k_shortest_paths(graph, origin, destination, k=ALTERNATIVE_ROUTES + 1)[1:]
+
+    result = (dist, path, access_flags, routes, search_stats)
+    ROUTE_RESULT_CACHE.put(key, result)
+    return result
+
+# ---------------- Reachability Query ----------------
+# "Everything within N minutes" answers are cached separately from routes:
+# they are larger, and many users ask for the same few origins and radii
+REACHABLE_CACHE = LRUCache()
+on_routes_changed(REACHABLE_CACHE.clear)
+
+def find_reachable(origin, minutes, accessible_only=False):
+    # [(location, distance_m)] nearest first, origin included
+    accessible_only = bool(accessible_only)
+    key = (origin, minutes, accessible_only, graph_change_key())
+    cached = REACHABLE_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    max_dist = minutes * 60 * WALKING_SPEED
+    graph = get_route_graph(accessible_only=accessible_only)
+    if origin in graph:
+        # One vectorized table row when the table is ready, else a
+        # truncated search
+        table = get_distance_table(accessible_only=accessible_only)
+        if table is not None:
+            reachable = table.within(origin, max_dist)
+        else:
+            reachable = reachable_within(graph, origin, max_dist)
+    else:
+        router = get_building_router(accessible_only=accessible_only)
+        reachable = [(name, d) for name, d in reachable_within(router.graph, origin, max_dist) if name not in router.cores]
+
+    REACHABLE_CACHE.put(key, reachable)
+    return reachable
+
+def find_nearest(origin, category, accessible_only=False):
+    # Nearest location of a category: (dist, path, access_flags, facility,
+    # search_stats), cached alongside ordinary routes
+    accessible_only = bool(accessible_only)
+    key = ("nearest", origin, category, accessible_only, graph_change_key())
+    cached = ROUTE_RESULT_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    search_stats = {}
+    result = (*nearest_facility(origin, category, accessible_only, search_stats), search_stats)
+    ROUTE_RESULT_CACHE.put(key, result)
+    return result
+
+def nearest_card(origin, category, dist, path, access_flags, facility):
+    if dist is None:
+        return dbc.Alert([
+            html.I(className="fas fa-times-circle me-2"),
+            f"No reachable {category} from {origin}."
+        ], color="warning", className="mt-3")
+
+    blocked = access_flags.count(False)
+    return html.Div([
+        html.Div([
+            html.Span(facility, className="fw-bold me-2"),
+            html.Span(f"{dist:.0f} m · ~{format_walking_time(dist)}", className="text-muted"),
+        ]),
+        html.Small(" → ".join(path), className="text-muted d-block", style={"wordBreak": "break-word"}),
+        html.Small(
+            "Fully Accessible" if not blocked else f"{blocked} inaccessible segment{'s' if blocked > 1 else ''}",
+            style={"color": LIGHT_GREEN if not blocked else ORANGE}
+        ),
+    ], className="mt-3")
+
+def find_reachable_many(origins, minutes, accessible_only=False):
+    # {origin: [(location, distance_m)]} for a batch of origins, e.g. to
+    # check which staff positions cover which locations
+    return {origin: find_reachable(origin, minutes, accessible_only) for origin in dict.fromkeys(origins)}
+
+def nearby_card(origin, minutes, reachable):
+    others = [(name, d) for name, d in reachable if name != origin]
+    if not others:
+        return dbc.Alert([
+            html.I(className="fas fa-info-circle me-2"),
+            f"No other locations within {minutes:g} minutes of {origin}."
+        ], color="info", className="mt-3")
+
+    return dbc.ListGroup([
+        dbc.ListGroupItem([
+            html.Span(name, className="fw-semibold me-2"),
+            html.Small(f"{d:.0f} m · ~{format_walking_time(d)}", className="text-muted"),
+        ]) for name, d in others
+    ], flush=True, className="mt-3")
+
+# ---------------- Route Options ----------------
+def find_route_options(origin, destination, accessible_only=False):
+    # Pareto-optimal routes over distance, inaccessible segments and floor
+    # changes from one multi-criteria search: (routes, search_stats), routes
+    # as (dist, path, access_flags, floor_changes), shortest first
+    accessible_only = bool(accessible_only)
+    key = ("options", origin, destination, accessible_only, graph_change_key())
+    cached = ROUTE_RESULT_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    search_stats = {}
+    router = get_building_router(accessible_only=accessible_only)
+    result = (router.pareto_routes(origin, destination, search_stats), search_stats)
+    ROUTE_RESULT_CACHE.put(key, result)
+    return result
+
+def route_options_card(routes):
+    if len(routes) < 2:
+        return dbc.Alert([
+            html.I(className="fas fa-info-circle me-2"),
+            "The shortest route is also the one with the fewest steps and floor changes."
+        ], color="info", className="mt-3")
+
+    # Name the extremes of the trade-off, then fill up with the shortest of
+    # the remaining options
+    tags = {0: ["Shortest"]}
+    fewest_steps = min(range(len(routes)), key=lambda i: (routes[i][2].count(False), routes[i][0]))
+    fewest_floors = min(range(len(routes)), key=lambda i: (routes[i][3], routes[i][0]))
+    tags.setdefault(fewest_steps, []).append("Fewest steps")
+    tags.setdefault(fewest_floors, []).append("Fewest floor changes")
+    others = [i for i in range(len(routes)) if i not in tags]
+    shown = sorted([*tags, *others[:max(0, ROUTE_OPTIONS - len(tags))]])
+
+    items = []
+    for i in shown:
+        dist, path, access_flags, floors = routes[i]
+        blocked = access_flags.count(False)
+        items.append(dbc.ListGroupItem([
+            html.Div([
+                html.Span(" · ".join(tags.get(i, [f"Option {i + 1}"])), className="fw-bold me-3"),
+                html.Span(f"{dist:.0f} m", className="me-3"),
+                html.Span(f"~{format_walking_time(dist)}", className="me-3 text-muted"),
+                html.Span(
+                    "Fully Accessible" if not blocked else f"{blocked} inaccessible segment{'s' if blocked > 1 else ''}",
+                    className="me-3", style={"color": LIGHT_GREEN if not blocked else ORANGE}
+                ),
+                html.Span(f"{floors} floor change{'s' if floors != 1 else ''}", className="text-muted"),
+            ], className="mb-1"),
+            html.Small(" → ".join(path), className="text-muted", style={"wordBreak": "break-word"})
+        ]))
+
+    return dbc.Card([
+        dbc.CardHeader([
+            html.I(className="fas fa-balance-scale me-2"),
+            "Route Options"
+        ], className="bg-info text-white fw-bold"),
+        dbc.CardBody(dbc.ListGroup(items, flush=True))
+    ], className="mt-3 shadow")
+
+# ---------------- Tour Query ----------------
+def find_tour(stops, accessible_only=False, round_trip=False):
+    # Best visiting order for stops, starting at the first one (see
+    # tour_optimizer.plan_tour for the result layout)
+    accessible_only, round_trip = bool(accessible_only), bool(round_trip)
+    key = ("tour", tuple(stops), accessible_only, round_trip, graph_change_key())
+    cached = ROUTE_RESULT_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    graph = get_route_graph(accessible_only=accessible_only)
+    table = None
+    if all(s in graph for s in stops):
+        table = get_distance_table(accessible_only=accessible_only)
+    else:
+        graph = get_building_router(accessible_only=accessible_only).graph
+    result = plan_tour(graph, stops, closed=round_trip, table=table)
+    ROUTE_RESULT_CACHE.put(key, result)
+    return result
+
+def tour_card(tour):
+    if not tour["legs"]:
+        return dbc.Alert([
+            html.I(className="fas fa-times-circle me-2"),
+            f"No tour found: {', '.join(tour['unreachable']) or 'the stops'} cannot be reached from {tour['order'][0] if tour['order'] else 'the first stop'}."
+        ], color="danger", className="mt-3")
+
+    dist = tour["distance"]
+    blocked = tour["access_flags"].count(False)
+    items = []
+    for i, (start, end, leg_dist, path, access_flags) in enumerate(tour["legs"], start=1):
+        leg_blocked = access_flags.count(False)
+        items.append(dbc.ListGroupItem([
+            html.Div([
+                html.Span(f"{i}. {start} → {end}", className="fw-bold me-3"),
+                html.Span(f"{leg_dist:.0f} m", className="me-3"),
+                html.Span(f"~{format_walking_time(leg_dist)}", className="me-3 text-muted"),
+                html.Span(
+                    "Fully Accessible" if not leg_blocked else f"{leg_blocked} inaccessible segment{'s' if leg_blocked > 1 else ''}",
+                    style={"color": LIGHT_GREEN if not leg_blocked else ORANGE}
+                ),
+            ], className="mb-1"),
+            html.Small(" → ".join(path), className="text-muted", style={"wordBreak": "break-word"})
+        ]))
+
+    body = [
+        html.P(" → ".join(tour["order"]), className="fw-semibold fs-5 mb-3", style={"wordBreak": "break-word"}),
+        dbc.Row([
+            dbc.Col([
+                html.Div([
+                    html.I(className="fas fa-ruler me-2 text-info"),
+                    html.Span(f"{dist:.0f} meters", className="fw-semibold")
+                ], className="mb-2")
+            ], md=4),
+            dbc.Col([
+                html.Div([
+                    html.I(className="fas fa-clock me-2 text-warning"),
+                    html.Span(f"~{format_walking_time(dist)}", className="fw-semibold")
+                ], className="mb-2")
+            ], md=4),
+            dbc.Col([
+                html.Div([
+                    html.I(className="fas fa-wheelchair me-2" if not blocked else "fas fa-exclamation-triangle me-2"),
+                    html.Span(
+                        "Fully Accessible" if not blocked else "Partially Accessible",
+                        className="fw-semibold", style={"color": LIGHT_GREEN if not blocked else ORANGE}
+                    )
+                ], className="mb-2")
+            ], md=4),
+        ], className="mb-3"),
+        dbc.ListGroup(items, flush=True),
+    ]
+    if tour["unreachable"]:
+        body.append(dbc.Alert([
+            html.I(className="fas fa-exclamation-triangle me-2"),
+            f"Left out (no route): {', '.join(tour['unreachable'])}"
+        ], color="warning", className="mt-3 mb-0"))
+
+    return dbc.Card([
+        dbc.CardHeader([
+            html.I(className="fas fa-check-circle me-2 text-success"),
+            f"Tour: {len(tour['legs'])} legs from {tour['order'][0]}"
+        ], className="bg-success text-white fw-bold"),
+        dbc.CardBody(body)
+    ], className="mt-3 shadow-lg border-success")
 
 # ---------------- Layout ----------------
 def layout():
-    df = load_path_data()
-    locations = sorted(set(df["start_location"].tolist() + df["end_location"].tolist())) if not df.empty else []
+    locations = sorted(set(get_route_graph()) | set(building_locations()))
 
     return dbc.Container([
         html.H3("🗺️ Smart Route Finder", className="mb-4 text-info fw-bold"),
@@ -133,6 +429,51 @@ def layout():
                             ], md=6),
                         ]),
 
+                        dbc.Row([
+                            dbc.Col([
+                                html.Label([
+                                    html.I(className="fas fa-project-diagram me-2 text-info"),
+                                    "Search Strategy"
+                                ], className="form-label fw-semibold"),
+                                dcc.Dropdown(
+                                    id="search-strategy",
+                                    options=[
+                                        {"label": "Automatic (fastest available)", "value": "auto"},
+                                        {"label": "Distance table (precomputed)", "value": "table"},
+                                        {"label": "Contraction hierarchy (precomputed)", "value": "ch"},
+                                        {"label": "Dijkstra", "value": "dijkstra"},
+                                        {"label": "Bidirectional Dijkstra", "value": "bidirectional"},
+                                        {"label": "A* (straight-line heuristic)", "value": "astar"},
+                                        {"label": "Building-aware (floors, stairs and lifts)", "value": "building"},
+                                    ],
+                                    value="auto",
+                                    clearable=False,
+                                    className="mb-3",
+                                    style={"borderRadius": "8px", "color": "black"}
+                                )
+                            ], md=6),
+                            dbc.Col([
+                                dbc.Checkbox(
+                                    id="show-tradeoffs",
+                                    label=[
+                                        html.I(className="fas fa-balance-scale me-2"),
+                                        "Compare shortest vs fewest steps and floor changes"
+                                    ],
+                                    className="mb-3 mt-md-4"
+                                )
+                            ], md=6),
+                        ]),
+
+                        dbc.Row([
+                            dbc.Col([
+                                html.Label([
+                                    html.I(className="fas fa-clock me-2 text-warning"),
+                                    "Departure Time (optional, applies scheduled closures)"
+                                ], className="form-label fw-semibold"),
+                                dbc.Input(id="departure-time", type="datetime-local", className="mb-3")
+                            ], md=6),
+                        ]),
+
                         dbc.Row([
                             dbc.Col([
                                 dbc.Button([
@@ -154,6 +495,46 @@ def layout():
                             children=[html.Div(id="path-output")]
                         )
                     ])
+                ], className="shadow-lg mb-4"),
+
+                dbc.Card([
+                    dbc.CardHeader([
+                        html.I(className="fas fa-map-marked-alt me-2"),
+                        "Multi-Stop Tour"
+                    ], className="bg-primary text-white fw-bold"),
+                    dbc.CardBody([
+                        html.Label([
+                            html.I(className="fas fa-list-ol me-2 text-info"),
+                            f"Stops (the first one is where the tour starts, up to {TOUR_MAX_STOPS})"
+                        ], className="form-label fw-semibold"),
+                        dcc.Dropdown(
+                            id="tour-stops",
+                            options=[{"label": f"📍 {loc}", "value": loc} for loc in locations],
+                            multi=True,
+                            placeholder="🏫 Select the locations to visit...",
+                            className="mb-3",
+                            style={"borderRadius": "8px", "color": "black"}
+                        ),
+                        dbc.Row([
+                            dbc.Col([
+                                dbc.Checkbox(
+                                    id="tour-round-trip",
+                                    label=[
+                                        html.I(className="fas fa-undo me-2"),
+                                        "Return to the first stop"
+                                    ],
+                                    className="mb-3"
+                                )
+                            ], md=6),
+                            dbc.Col([
+                                dbc.Button([
+                                    html.I(className="fas fa-route me-2"),
+                                    "Plan Tour"
+                                ], id="tour-btn", color="primary", className="w-100 mb-2 fw-semibold"),
+                            ], md=6),
+                        ]),
+                        dcc.Loading(type="circle", children=[html.Div(id="tour-output")])
+                    ])
                 ], className="shadow-lg mb-4")
             ], md=8),
 
@@ -167,7 +548,7 @@ def layout():
                         html.Ul([
                             html.Li([
                                 html.I(className="fas fa-clock me-2 text-warning"),
-                                "Average walking speed: 1.4 m/s"
+                                f"Average walking speed: {WALKING_SPEED} m/s"
                             ], className="mb-2"),
                             html.Li([
                                 html.I(className="fas fa-wheelchair me-2 text-primary"),
@@ -175,7 +556,7 @@ def layout():
                             ], className="mb-2"),
                             html.Li([
                                 html.I(className="fas fa-route me-2 text-success"),
-                                "Shortest path calculated using Dijkstra's algorithm"
+                                "Shortest path from precomputed tables, a contraction hierarchy, or Dijkstra/A* search"
                             ], className="mb-2"),
                             html.Li([
                                 html.I(className="fas fa-map me-2 text-info"),
@@ -185,6 +566,45 @@ def layout():
                     ])
                 ], className="shadow mb-4"),
 
+                dbc.Card([
+                    dbc.CardHeader([
+                        html.I(className="fas fa-walking me-2"),
+                        "What's Nearby"
+                    ], className="bg-success text-white fw-bold"),
+                    dbc.CardBody([
+                        html.Label("Minutes from the starting point", className="form-label fw-semibold"),
+                        dbc.InputGroup([
+                            dbc.Input(id="nearby-minutes", type="number", min=1, step=1, value=NEARBY_MINUTES),
+                            dbc.Button([
+                                html.I(className="fas fa-search-location me-2"),
+                                "Show"
+                            ], id="nearby-btn", color="success"),
+                        ]),
+                        dcc.Loading(type="circle", children=[html.Div(id="nearby-output")])
+                    ])
+                ], className="shadow mb-4"),
+
+                dbc.Card([
+                    dbc.CardHeader([
+                        html.I(className="fas fa-map-signs me-2"),
+                        "Nearest Facility"
+                    ], className="bg-primary text-white fw-bold"),
+                    dbc.CardBody([
+                        dbc.InputGroup([
+                            dbc.Select(
+                                id="nearest-category",
+                                options=[{"label": c.title(), "value": c} for c in facility_categories()],
+                                placeholder="Cafeteria, toilet, exit...",
+                            ),
+                            dbc.Button([
+                                html.I(className="fas fa-crosshairs me-2"),
+                                "Find"
+                            ], id="nearest-btn", color="primary"),
+                        ]),
+                        dcc.Loading(type="circle", children=[html.Div(id="nearest-output")])
+                    ])
+                ], className="shadow mb-4"),
+
                 dbc.Card([
                     dbc.CardHeader([
                         html.I(className="fas fa-star me-2"),
@@ -209,60 +629,71 @@ def register_find_routes_callbacks(app):
          Output("origin-point", "value"),
          Output("destination-point", "value"),
          Output("accessibility-filter", "value"),
-         Output("show-alternatives", "value")],
+         Output("show-alternatives", "value"),
+         Output("show-tradeoffs", "value")],
         [Input("optimize-btn", "n_clicks"),
          Input("clear-btn", "n_clicks")],
         [State("origin-point", "value"),
          State("destination-point", "value"),
          State("accessibility-filter", "value"),
-         State("show-alternatives", "value")],
+         State("show-alternatives", "value"),
+         State("search-strategy", "value"),
+         State("show-tradeoffs", "value"),
+         State("departure-time", "value")],
         prevent_initial_call=True
     )
-    def handle_route_actions(optimize_clicks, clear_clicks, origin, destination, accessibility_only, show_alternatives):
+    def handle_route_actions(optimize_clicks, clear_clicks, origin, destination, accessibility_only, show_alternatives, strategy, show_tradeoffs, departure_time):
         ctx = callback_context
         if not ctx.triggered:
-            return "", None, None, False, False
+            return "", None, None, False, False, False
 
         button_id = ctx.triggered[0]['prop_id'].split('.')[0]
 
         # Handle clear button
         if button_id == "clear-btn":
-            return "", None, None, False, False
+            return "", None, None, False, False, False
 
         # Handle optimize button
         if not origin or not destination:
             return dbc.Alert([
                 html.I(className="fas fa-exclamation-triangle me-2"),
                 "Please select both starting point and destination to find your route."
-            ], color="warning", className="mt-3"), origin, destination, accessibility_only, show_alternatives
+            ], color="warning", className="mt-3"), origin, destination, accessibility_only, show_alternatives, show_tradeoffs
 
         if origin == destination:
             return dbc.Alert([
                 html.I(className="fas fa-exclamation-circle me-2"),
                 "Starting point and destination cannot be the same location."
-            ], color="warning", className="mt-3"), origin, destination, accessibility_only, show_alternatives
-
-        df = load_path_data()
-        graph = build_graph(df)
+            ], color="warning", className="mt-3"), origin, destination, accessibility_only, show_alternatives, show_tradeoffs
 
-        dist, path, access_flags = dijkstra_shortest_path(graph, origin, destination)
+        departure = datetime.fromisoformat(departure_time) if departure_time else None
+        dist, path, access_flags, alternatives, search_stats = find_route(
+            origin, destination, accessibility_only, show_alternatives, strategy, departure
+        )
 
-        if dist is None:
+        # Connected but no path: everything on the way is closed at that time
+        if dist is None and departure is not None and get_timed_graph(accessibility_only).connected(origin, destination):
             return dbc.Alert([
-                html.I(className="fas fa-times-circle me-2"),
-                f"No route found between {origin} and {destination}. Please check if both locations exist."
-            ], color="danger", className="mt-3"), origin, destination, accessibility_only, show_alternatives
+                html.I(className="fas fa-door-closed me-2"),
+                f"No open route between {origin} and {destination} when leaving at {departure:%a %d %b %H:%M}. Try another departure time."
+            ], color="warning", className="mt-3"), origin, destination, accessibility_only, show_alternatives, show_tradeoffs
 
-        # Check accessibility if filter is enabled
-        if accessibility_only and False in access_flags:
+        if dist is None and accessibility_only:
             return dbc.Alert([
                 html.I(className="fas fa-wheelchair me-2"),
                 "No fully accessible route found. Try disabling the accessibility filter or choose different locations."
-            ], color="warning", className="mt-3"), origin, destination, accessibility_only, show_alternatives
+            ], color="warning", className="mt-3"), origin, destination, accessibility_only, show_alternatives, show_tradeoffs
 
-        # Calculate estimated walking time (assuming 1.4 m/s average walking speed)
-        walking_time_minutes = (dist / 1.4) / 60
-        time_display = f"{walking_time_minutes:.1f} minutes" if walking_time_minutes < 60 else f"{walking_time_minutes/60:.1f} hours"
+        if dist is None:
+            return dbc.Alert([
+                html.I(className="fas fa-times-circle me-2"),
+                f"No route found between {origin} and {destination}. Please check if both locations exist."
+            ], color="danger", className="mt-3"), origin, destination, accessibility_only, show_alternatives, show_tradeoffs
+
+        time_display = format_walking_time(dist)
+        # Time-aware routes may wait at a location for a closure to end
+        if search_stats.get("wait_s", 0) >= 30:
+            time_display += f" + {search_stats['wait_s'] / 60:.1f} minutes waiting"
 
         path_str = " → ".join(path)
         access_status = "Fully Accessible" if all(access_flags) else "Partially Accessible"
@@ -310,10 +741,81 @@ def register_find_routes_callbacks(app):
                             html.I(className="fas fa-directions me-2 text-secondary"),
                             html.Span(f"{len(path)-1} segments", className="text-muted")
                         ])
-                    ], md=12),
+                    ], md=6),
+                    dbc.Col([
+                        html.Div([
+                            html.I(className="fas fa-project-diagram me-2 text-secondary"),
+                            html.Span(f"{search_stats['settled']} locations explored ({search_stats['strategy']})", className="text-muted")
+                        ])
+                    ], md=6),
                 ])
             ])
         ], className="mt-3 shadow-lg border-success")
 
-        return result_card, origin, destination, accessibility_only, show_alternatives
+        if show_alternatives:
+            result_card = html.Div([result_card, alternatives_card(alternatives)])
+
+        if show_tradeoffs:
+            options, _ = find_route_options(origin, destination, accessibility_only)
+            result_card = html.Div([result_card, route_options_card(options)])
+
+        return result_card, origin, destination, accessibility_only, show_alternatives, show_tradeoffs
+
+    # ---------------- What's Nearby ----------------
+    @app.callback(
+        Output("nearby-output", "children"),
+        Input("nearby-btn", "n_clicks"),
+        State("origin-point", "value"),
+        State("nearby-minutes", "value"),
+        State("accessibility-filter", "value"),
+        prevent_initial_call=True
+    )
+    def show_nearby(n_clicks, origin, minutes, accessibility_only):
+        if not origin:
+            return dbc.Alert([
+                html.I(className="fas fa-exclamation-triangle me-2"),
+                "Select a starting point first."
+            ], color="warning", className="mt-3")
+        minutes = float(minutes or NEARBY_MINUTES)
+        return nearby_card(origin, minutes, find_reachable(origin, minutes, accessibility_only))
 
+    # ---------------- Nearest Facility ----------------
+    @app.callback(
+        Output("nearest-output", "children"),
+        Input("nearest-btn", "n_clicks"),
+        State("origin-point", "value"),
+        State("nearest-category", "value"),
+        State("accessibility-filter", "value"),
+        prevent_initial_call=True
+    )
+    def show_nearest(n_clicks, origin, category, accessibility_only):
+        if not origin or not category:
+            return dbc.Alert([
+                html.I(className="fas fa-exclamation-triangle me-2"),
+                "Select a starting point and a category first."
+            ], color="warning", className="mt-3")
+        dist, path, access_flags, facility, _ = find_nearest(origin, category, accessibility_only)
+        return nearest_card(origin, category, dist, path, access_flags, facility)
+
+    # ---------------- Multi-Stop Tour ----------------
+    @app.callback(
+        Output("tour-output", "children"),
+        Input("tour-btn", "n_clicks"),
+        State("tour-stops", "value"),
+        State("tour-round-trip", "value"),
+        State("accessibility-filter", "value"),
+        prevent_initial_call=True
+    )
+    def show_tour(n_clicks, stops, round_trip, accessibility_only):
+        stops = list(dict.fromkeys(stops or []))
+        if len(stops) < 2:
+            return dbc.Alert([
+                html.I(className="fas fa-exclamation-triangle me-2"),
+                "Select at least two stops for a tour."
+            ], color="warning", className="mt-3")
+        if len(stops) > TOUR_MAX_STOPS:
+            return dbc.Alert([
+                html.I(className="fas fa-exclamation-triangle me-2"),
+                f"A tour can have at most {TOUR_MAX_STOPS} stops."
+            ], color="warning", className="mt-3")
+        return tour_card(find_tour(stops, accessibility_only, round_trip))
@@ -0,0 +1,706 @@
+import os
+import uuid
+import sqlite3
+import hashlib
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+
+from modules.append_log import AppendLog
+from modules.storage import file_lock, write_csv
+
+# Shared storage for the app's tables. Every module reads and writes
+# routes, locations, notifications, users and closures through this layer; the
+# read_* / save_* functions in the screens are thin adapters over it.
+#
+# Two backends, chosen with the CAMPUS_DATA_BACKEND environment variable:
+#
+#   csv     (default) one CSV file per table under data/, as before. Row
+#           operations read the file, change one row and rewrite it, except
+#           on tables with a change log (notifications), where they append
+#           one record to the log (see append_log.py).
+#   sqlite  one SQLite database (data/campus.db, or CAMPUS_DB_PATH) in WAL
+#           mode, so readers never block the writer. Row operations touch
+#           only that row, through indexes on id, start/end location,
+#           user_id and username.
+#
+# Each table of a database is seeded from its CSV file the first time the
+# database is opened with that table in it.
+# To move data between the two by hand:
+#
+#   python -m modules.repository import [table ...]   # CSV -> SQLite
+#   python -m modules.repository export [table ...]   # SQLite -> CSV
+#   python -m modules.repository compact [table ...]  # fold change logs into the CSVs
+
+DATA_BACKEND = os.environ.get("CAMPUS_DATA_BACKEND", "csv").strip().lower()
+SQLITE_PATH = os.environ.get("CAMPUS_DB_PATH", "data/campus.db")
+# "c" (default) or "pyarrow" (multi-threaded, needs pyarrow installed)
+CSV_ENGINE = os.environ.get("CAMPUS_CSV_ENGINE", "c").strip().lower()
+
+TRUE_VALUES = ["True", "true", "TRUE"]
+FALSE_VALUES = ["False", "false", "FALSE"]
+
+# ---------------- Schema ----------------
+# Each table declares its columns once; both backends return frames in
+# this shape, so the screens and the route engine never re-parse values:
+#
+#   INTEGER / REAL  int64 / float64 (int columns with gaps become float64,
+#                   like pandas; values that are not numbers are kept as
+#                   they are in INTEGER columns and become NaN in REAL ones)
+#   booleans        bool, from True/False in the CSV or 0/1 in SQLite;
+#                   anything else reads as False
+#   categories      pandas categoricals: a code per row instead of a string,
+#                   for columns with few distinct values
+#   TEXT            strings
+#
+# CSV files are parsed by pandas' C reader (or pyarrow) with these dtypes
+# up front; a file that does not fit them (a stray value in a numeric
+# column, say) is re-read leniently and converted column by column.
+
+class Table:
+    # columns: [(name, SQLite type)]; id is the primary key. booleans are
+    # stored as 0/1 in SQLite and read back as bool. text tables (users)
+    # are read with every value as a string, like csv.DictReader. log
+    # tables take row operations as appends to a change log in CSV mode.
+
+    def __init__(self, name, path, columns, booleans=(), categories=(), indexes=(), text=False, log=False):
+        self.name = name
+        self.path = path
+        self.log_path = os.path.splitext(path)[0] + ".log.jsonl" if log else None
+        self.columns = [c for c, _ in columns]
+        self.types = dict(columns)
+        self.booleans = tuple(booleans)
+        self.categories = tuple(categories)
+        self.indexes = tuple(indexes)
+        self.text = text
+
+    @property
+    def integer_id(self):
+        return self.types["id"] == "INTEGER"
+
+    def dtypes(self):
+        # pandas dtypes for read_csv; booleans are left to true_values /
+        # false_values since a blank cell would fail a bool dtype
+        dtypes = {}
+        for column, sql_type in self.types.items():
+            if column in self.categories:
+                dtypes[column] = "category"
+            elif self.text or sql_type == "TEXT":
+                dtypes[column] = str
+            elif column not in self.booleans:
+                dtypes[column] = "int64" if sql_type == "INTEGER" else "float64"
+        return dtypes
+
+    def read_csv(self, path):
+        options = {"engine": _csv_engine(), "true_values": TRUE_VALUES, "false_values": FALSE_VALUES}
+        if self.text:
+            options["keep_default_na"] = False
+        try:
+            df = pd.read_csv(path, dtype=self.dtypes(), **options)
+        except (ValueError, TypeError):
+            df = pd.read_csv(path, **options)
+        return self.conform(df)
+
+    def conform(self, df):
+        # Convert whatever columns are not in their schema dtype yet
+        for column, sql_type in self.types.items():
+            if column not in df.columns:
+                continue
+            values = df[column]
+            if column in self.booleans:
+                if values.dtype != bool:
+                    df[column] = _as_bool(values)
+            elif column in self.categories:
+                if not isinstance(values.dtype, pd.CategoricalDtype):
+                    df[column] = values.fillna("").astype(str).astype("category") if self.text else values.astype("category")
+            elif self.text or sql_type == "TEXT":
+                continue
+            elif not pd.api.types.is_numeric_dtype(values):
+                numbers = pd.to_numeric(values, errors="coerce")
+                if sql_type == "REAL" or numbers.notna().sum() == values.notna().sum():
+                    df[column] = numbers
+        return df
+
+    def empty(self):
+        return self.conform(pd.DataFrame(columns=self.columns))
+
+def _as_bool(values):
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+        return values.fillna(False).astype(bool)
+    return values.astype(str).str.lower().eq("true")
+
+def _csv_engine():
+    if CSV_ENGINE == "pyarrow":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ImportError("CAMPUS_CSV_ENGINE=pyarrow requires pyarrow (pip install pyarrow)") from e
+    return CSV_ENGINE
+
+TABLES = {
+    "routes": Table(
+        "routes", "data/routes.csv",
+        [("id", "INTEGER"), ("start_location", "TEXT"), ("end_location", "TEXT"), ("distance_m", "REAL"), ("accessible", "INTEGER")],
+        booleans=["accessible"],
+        categories=["start_location", "end_location"],
+        indexes=[("start_location", "end_location"), ("end_location",)],
+    ),
+    "locations": Table(
+        "locations", "data/locations.csv",
+        [("id", "INTEGER"), ("name", "TEXT"), ("building", "TEXT"), ("floor", "INTEGER"), ("accessible", "INTEGER"),
+         ("x", "REAL"), ("y", "REAL"), ("category", "TEXT")],
+        booleans=["accessible"],
+        categories=["building"],
+        indexes=[("name",)],
+    ),
+    "notifications": Table(
+        "notifications", "data/notification.csv",
+        [("id", "INTEGER"), ("user_id", "INTEGER"), ("message", "TEXT"), ("delivered", "INTEGER")],
+        booleans=["delivered"],
+        indexes=[("user_id",)],
+        log=True,
+    ),
+    "users": Table(
+        "users", "data/users.csv",
+        [("id", "TEXT"), ("username", "TEXT"), ("password", "TEXT"), ("full_name", "TEXT"), ("email", "TEXT"),
+         ("role", "TEXT"), ("status", "TEXT")],
+        categories=["role", "status"],
+        indexes=[("username",)],
+        text=True,
+    ),
+    "closures": Table(
+        "closures", "data/closures.csv",
+        [("id", "INTEGER"), ("target_type", "TEXT"), ("target", "TEXT"), ("start", "TEXT"), ("end", "TEXT"),
+         ("days", "TEXT"), ("reason", "TEXT")],
+        categories=["target_type"],
+    ),
+}
+
+def file_key(path):
+    # Change key of a single file (None while it does not exist); a file
+    # replaced by atomic_write always gets a new inode
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size, st.st_ino
+    except FileNotFoundError:
+        return None
+
+def _next_id(df):
+    ids = pd.to_numeric(df["id"], errors="coerce") if len(df) else pd.Series(dtype=float)
+    return int(ids.max()) + 1 if ids.notna().any() else 1
+
+def _plain_value(value):
+    # numpy scalars -> Python, NaN -> None (NULL / JSON null)
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+def _fold(df, changes):
+    # Apply a change log index (AppendLog.changes) to the table read from
+    # the CSV: tombstoned rows are dropped, partial updates are set in
+    # place and rows inserted through the log are appended
+    ids = df["id"].astype(str)
+    replaced = ids.isin([key for key, change in changes.items() if change is None or change[0]])
+    df, ids = df[~replaced], ids[~replaced]
+
+    partial = {key: change[1] for key, change in changes.items() if change is not None and not change[0]}
+    if partial:
+        df = df.copy()
+        updates = pd.DataFrame.from_dict(partial, orient="index")
+        for column in updates.columns:
+            values = updates[column].dropna()
+            hit = ids.isin(values.index)
+            if hit.any():
+                current = df[column].astype(object) if column in df.columns else pd.Series(None, index=df.index, dtype=object)
+                df[column] = current.where(~hit, ids.map(values))
+
+    inserted = [change[1] for change in changes.values() if change is not None and change[0]]
+    if inserted:
+        df = pd.concat([df, pd.DataFrame(inserted)], ignore_index=True)
+    return df
+
+# ---------------- CSV Backend ----------------
+class CsvBackend:
+    # The files are the source of truth; row operations are a full
+    # read-modify-write of the table, or an append to its change log.
+    # Files are replaced atomically and every change holds the table's
+    # exclusive file lock, so several worker processes can share data/.
+
+    name = "csv"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._logs = {}
+        self._bases = {}
+        self._compacting = set()
+
+    def exists(self, table):
+        return os.path.exists(table.path) or (table.log_path is not None and os.path.exists(table.log_path))
+
+    def _read_file(self, table):
+        if not os.path.exists(table.path):
+            return table.empty()
+        return table.read_csv(table.path)
+
+    def read(self, table):
+        if table.log_path is None:
+            return self._read_file(table)
+        # The CSV and its log must be read as a pair: a compaction in
+        # another process between the two would drop the logged changes
+        log = self._log(table)
+        with file_lock(table.path, shared=True), log.lock:
+            base = file_key(table.path)
+            df = self._read_file(table)
+            changes = log.changes(base)
+        return table.conform(_fold(df, changes)) if changes else df
+
+    def lock(self, table):
+        return file_lock(table.path)
+
+    def write(self, table, df):
+        with self.lock(table):
+            write_csv(df, table.path)
+            if table.log_path is not None:
+                self._log(table).clear()
+
+    # ---- change log ----
+    def _log(self, table):
+        with self._lock:
+            if table.name not in self._logs:
+                self._logs[table.name] = AppendLog(table.log_path)
+            return self._logs[table.name]
+
+    def _base_ids(self, table):
+        # Ids in the CSV itself (not the log) and the largest integer id,
+        # re-read only when the file changes
+        key = file_key(table.path)
+        cached = self._bases.get(table.name)
+        if cached is None or cached[0] != key:
+            df = self._read_file(table)
+            cached = self._bases[table.name] = key, set(df["id"].astype(str)), _next_id(df) - 1
+        return cached[1], cached[2]
+
+    def _logged_row_exists(self, table, log, key):
+        changes = log.refresh(file_key(table.path))
+        if key in changes:
+            return changes[key] is not None
+        return key in self._base_ids(table)[0]
+
+    def _append(self, table, log, record):
+        if log.append([record]) > log.compact_bytes:
+            self._compact_async(table)
+
+    def _log_insert(self, table, row):
+        log = self._log(table)
+        with log.lock:
+            row = {column: _plain_value(value) for column, value in row.items()}
+            if row.get("id") is None:
+                log.refresh(file_key(table.path))
+                row["id"] = max(self._base_ids(table)[1], log.max_id) + 1 if table.integer_id else str(uuid.uuid4())
+            self._append(table, log, {"op": "insert", "id": row["id"], "values": row})
+        return row["id"]
+
+    def _log_update(self, table, row_id, values):
+        log = self._log(table)
+        with log.lock:
+            if not self._logged_row_exists(table, log, str(row_id)):
+                return False
+            values = {column: _plain_value(value) for column, value in values.items() if column != "id"}
+            self._append(table, log, {"op": "update", "id": _plain_value(row_id), "values": values})
+        return True
+
+    def _log_delete(self, table, row_id):
+        log = self._log(table)
+        with log.lock:
+            if not self._logged_row_exists(table, log, str(row_id)):
+                return False
+            self._append(table, log, {"op": "delete", "id": _plain_value(row_id)})
+        return True
+
+    def compact(self, table):
+        # Fold the change log into the CSV
+        if table.log_path is None:
+            return False
+        with self.lock(table), self._log(table).lock:
+            if not os.path.exists(table.log_path):
+                return False
+            self.write(table, self.read(table))
+        return True
+
+    def _compact_async(self, table):
+        with self._lock:
+            if table.name in self._compacting:
+                return
+            self._compacting.add(table.name)
+
+        def run():
+            try:
+                self.compact(table)
+            except Exception as e:
+                print(f"Error compacting {table.log_path}: {e}")
+            finally:
+                with self._lock:
+                    self._compacting.discard(table.name)
+
+        threading.Thread(target=run, name=f"{table.name}-log-compaction", daemon=True).start()
+
+    def get(self, table, row_id):
+        df = cached_read(self, table)
+        match = df[df["id"].astype(str) == str(row_id)]
+        return match.iloc[0].to_dict() if len(match) else None
+
+    def insert(self, table, row):
+        with self.lock(table):
+            if table.log_path is not None:
+                return self._log_insert(table, row)
+            df = cached_read(self, table)
+            row = dict(row)
+            if row.get("id") is None:
+                row["id"] = _next_id(df) if table.integer_id else str(uuid.uuid4())
+            self.write(table, pd.concat([df, pd.DataFrame([row])], ignore_index=True))
+            return row["id"]
+
+    def update(self, table, row_id, values):
+        with self.lock(table):
+            if table.log_path is not None:
+                return self._log_update(table, row_id, values)
+            df = cached_read(self, table)
+            match = df["id"].astype(str) == str(row_id)
+            if not match.any():
+                return False
+            for column, value in values.items():
+                if column not in df.columns:
+                    df[column] = None
+                df[column] = df[column].astype(object)
+                df.loc[match, column] = value
+            self.write(table, df)
+            return True
+
+    def delete(self, table, row_id):
+        with self.lock(table):
+            if table.log_path is not None:
+                return self._log_delete(table, row_id)
+            df = cached_read(self, table)
+            keep = df["id"].astype(str) != str(row_id)
+            if keep.all():
+                return False
+            self.write(table, df[keep])
+            return True
+
+    def key(self, table):
+        if table.log_path is None:
+            return file_key(table.path)
+        return file_key(table.path), file_key(table.log_path)
+
+    def fingerprint(self, table):
+        digest = hashlib.sha256()
+        for path in (table.path, table.log_path):
+            if path is not None and os.path.exists(path):
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+        return digest.hexdigest() if self.exists(table) else ""
+
+# ---------------- SQLite Backend ----------------
+class SqliteBackend:
+    # Every write also replaces the table's stamp in _table_stamps (same
+    # transaction), a random token that serves as both the change key and
+    # the content fingerprint of the table across processes. Writes hold a
+    # per-table file lock as well, so table_lock() works as on the CSVs.
+
+    name = "sqlite"
+
+    def __init__(self, path=None):
+        self.path = path or SQLITE_PATH
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._schema_lock:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS _table_stamps (name TEXT PRIMARY KEY, stamp TEXT NOT NULL)")
+                for table in TABLES.values():
+                    columns = ", ".join(
+                        f'"{c}" {t} PRIMARY KEY' if c == "id" else f'"{c}" {t}' for c, t in table.types.items()
+                    )
+                    conn.execute(f'CREATE TABLE IF NOT EXISTS "{table.name}" ({columns})')
+                    for index in table.indexes:
+                        conn.execute(
+                            f'CREATE INDEX IF NOT EXISTS "{table.name}_{"_".join(index)}" '
+                            f'ON "{table.name}" ({", ".join(index)})'
+                        )
+            stamped = {name for name, in conn.execute("SELECT name FROM _table_stamps")}
+            for table in TABLES.values():
+                if table.name not in stamped and os.path.exists(table.path):
+                    self._replace(conn, table, CsvBackend().read(table))
+        return conn
+
+    def _stamp(self, conn, table):
+        conn.execute("INSERT OR REPLACE INTO _table_stamps VALUES (?, ?)", (table.name, uuid.uuid4().hex))
+
+    def _row(self, table, row):
+        values = {c: _plain_value(row[c]) for c in table.columns if c in row}
+        for c in table.booleans:
+            value = values.get(c)
+            if value is not None:
+                values[c] = bool(value) if isinstance(value, (bool, int, float)) else str(value).lower() == "true"
+        return values
+
+    def _replace(self, conn, table, df):
+        df = df.reindex(columns=table.columns)
+        with conn:
+            conn.execute(f'DELETE FROM "{table.name}"')
+            placeholders = ", ".join("?" * len(table.columns))
+            conn.executemany(
+                f'INSERT INTO "{table.name}" VALUES ({placeholders})',
+                ([self._row(table, row).get(c) for c in table.columns] for row in df.to_dict("records")),
+            )
+            self._stamp(conn, table)
+
+    def exists(self, table):
+        return self.key(table) is not None
+
+    def read(self, table):
+        df = pd.read_sql_query(f'SELECT * FROM "{table.name}" ORDER BY rowid', self._conn())
+        if table.text:
+            df = df.fillna("").astype(str)
+        return table.conform(df)
+
+    def lock(self, table):
+        return file_lock(f"{self.path}.{table.name}")
+
+    def write(self, table, df):
+        with self.lock(table):
+            self._replace(self._conn(), table, df)
+
+    def get(self, table, row_id):
+        cursor = self._conn().execute(f'SELECT * FROM "{table.name}" WHERE id = ?', (_plain_value(row_id),))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        row = dict(zip([d[0] for d in cursor.description], row))
+        for c in table.booleans:
+            row[c] = bool(row[c])
+        return row
+
+    def insert(self, table, row):
+        values = self._row(table, row)
+        if values.get("id") is None:
+            values.pop("id", None)
+            if not table.integer_id:
+                values["id"] = str(uuid.uuid4())
+        conn = self._conn()
+        with self.lock(table), conn:
+            columns = ", ".join(f'"{c}"' for c in values)
+            cursor = conn.execute(
+                f'INSERT INTO "{table.name}" ({columns}) VALUES ({", ".join("?" * len(values))})',
+                list(values.values()),
+            )
+            self._stamp(conn, table)
+        return values.get("id", cursor.lastrowid)
+
+    def update(self, table, row_id, values):
+        values = self._row(table, values)
+        values.pop("id", None)
+        if not values:
+            return self.get(table, row_id) is not None
+        conn = self._conn()
+        with self.lock(table), conn:
+            assignments = ", ".join(f'"{c}" = ?' for c in values)
+            cursor = conn.execute(
+                f'UPDATE "{table.name}" SET {assignments} WHERE id = ?',
+                [*values.values(), _plain_value(row_id)],
+            )
+            if cursor.rowcount:
+                self._stamp(conn, table)
+        return cursor.rowcount > 0
+
+    def delete(self, table, row_id):
+        conn = self._conn()
+        with self.lock(table), conn:
+            cursor = conn.execute(f'DELETE FROM "{table.name}" WHERE id = ?', (_plain_value(row_id),))
+            if cursor.rowcount:
+                self._stamp(conn, table)
+        return cursor.rowcount > 0
+
+    def key(self, table):
+        row = self._conn().execute("SELECT stamp FROM _table_stamps WHERE name = ?", (table.name,)).fetchone()
+        return row[0] if row else None
+
+    def fingerprint(self, table):
+        return f"sqlite:{self.key(table) or ''}"
+
+# ---------------- Backend Selection ----------------
+BACKENDS = {"csv": CsvBackend, "sqlite": SqliteBackend}
+
+_backend_lock = threading.Lock()
+_backend = None
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if DATA_BACKEND not in BACKENDS:
+                raise ValueError(f"Unknown CAMPUS_DATA_BACKEND {DATA_BACKEND!r}; expected one of {sorted(BACKENDS)}")
+            _backend = BACKENDS[DATA_BACKEND]()
+        return _backend
+
+# ---------------- Table Cache ----------------
+# One parsed copy of each table per process, reused until the table's
+# change key moves (file mtime/size/inode, the log file too for logged
+# tables, or the SQLite stamp). The key is taken before reading, so a
+# write racing the read only costs one extra reload later. Callers get a
+# shallow copy: under pandas copy-on-write (the default from pandas 3) it
+# shares the cached data until either side modifies it, so callers may
+# add or overwrite columns freely; older pandas gets a deep copy.
+_COPY_ON_WRITE = int(pd.__version__.split(".")[0]) >= 3 or pd.get_option("mode.copy_on_write") is True
+
+_cache_lock = threading.Lock()
+_table_cache = {}
+TABLE_CACHE_STATS = {}
+
+def _cache_slot(backend, table):
+    return type(backend).__name__, getattr(backend, "path", None), table.name
+
+def _cached_entry(backend, table):
+    # (frame, records) for the table's current contents
+    key = backend.key(table)
+    slot = _cache_slot(backend, table)
+    with _cache_lock:
+        stats = TABLE_CACHE_STATS.setdefault(table.name, {"hits": 0, "misses": 0, "reloads": 0})
+        entry = _table_cache.get(slot)
+        if key is not None and entry is not None and entry[0] == key:
+            stats["hits"] += 1
+            return entry[1]
+        stats["misses"] += 1
+        if entry is not None:
+            stats["reloads"] += 1
+    df = backend.read(table)
+    value = [df, None]
+    if key is not None:
+        with _cache_lock:
+            _table_cache[slot] = (key, value)
+    return value
+
+def cached_read(backend, table):
+    df = _cached_entry(backend, table)[0]
+    return df.copy(deep=not _COPY_ON_WRITE)
+
+def table_cache_stats():
+    # Per table: hits, misses, reloads (misses after a change) and hit_ratio
+    with _cache_lock:
+        stats = {name: dict(s) for name, s in TABLE_CACHE_STATS.items()}
+    for s in stats.values():
+        lookups = s["hits"] + s["misses"]
+        s["hit_ratio"] = s["hits"] / lookups if lookups else 0.0
+    return stats
+
+# ---------------- Table Access ----------------
+def read_table(name):
+    return cached_read(get_backend(), TABLES[name])
+
+def read_records(name):
+    # Rows as a list of fresh dicts (users are handled this way)
+    entry = _cached_entry(get_backend(), TABLES[name])
+    if entry[1] is None:
+        entry[1] = entry[0].to_dict("records")
+    return [dict(record) for record in entry[1]]
+
+def write_table(name, data):
+    # Replaces the whole table; data is a DataFrame or a list of dicts
+    table = TABLES[name]
+    df = data if isinstance(data, pd.DataFrame) else pd.DataFrame(list(data), columns=table.columns)
+    get_backend().write(table, df)
+
+def table_exists(name):
+    # False until the table's file exists / it is first written
+    return get_backend().exists(TABLES[name])
+
+def get_row(name, row_id):
+    return get_backend().get(TABLES[name], row_id)
+
+def insert_row(name, row):
+    # Returns the row id; a missing id is assigned (next integer, or a
+    # UUID for the users table)
+    return get_backend().insert(TABLES[name], row)
+
+def update_row(name, row_id, values):
+    return get_backend().update(TABLES[name], row_id, values)
+
+def delete_row(name, row_id):
+    return get_backend().delete(TABLES[name], row_id)
+
+def table_key(name):
+    # Cheap value that changes whenever the table is written, for caches
+    return get_backend().key(TABLES[name])
+
+def table_lock(name):
+    # Exclusive lock on the table, shared by every process and held by
+    # each write. Hold it around a write to also read the table's key (or
+    # contents) right before and after it without another write slipping
+    # in between; re-entrant within a thread.
+    return get_backend().lock(TABLES[name])
+
+def table_fingerprint(name):
+    # Content identity that holds across processes and restarts, for
+    # artefacts persisted on disk
+    return get_backend().fingerprint(TABLES[name])
+
+# ---------------- CSV Import / Export ----------------
+def import_csv(names=None, path=None):
+    # Replace the SQLite tables with the CSV files' contents
+    db, csv = SqliteBackend(path), CsvBackend()
+    imported = {}
+    for name in names or TABLES:
+        table = TABLES[name]
+        if csv.exists(table):
+            df = csv.read(table)
+            db.write(table, df)
+            imported[name] = len(df)
+    return imported
+
+def export_csv(names=None, path=None):
+    # Write the SQLite tables back out as the CSV files
+    db, csv = SqliteBackend(path), CsvBackend()
+    exported = {}
+    for name in names or TABLES:
+        table = TABLES[name]
+        df = db.read(table)
+        csv.write(table, df)
+        exported[name] = len(df)
+    return exported
+
+def compact_logs(names=None):
+    # Fold the CSV tables' change logs into the files; returns the tables
+    # that had a log
+    csv = CsvBackend()
+    return [name for name in names or TABLES if csv.compact(TABLES[name])]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy tables between the CSV files and the SQLite database")
+    parser.add_argument("direction", choices=["import", "export", "compact"], help="import: CSV -> SQLite, export: SQLite -> CSV, compact: fold CSV change logs")
+    parser.add_argument("tables", nargs="*", help=f"any of {', '.join(TABLES)} (default: all)")
+    parser.add_argument("--db", default=SQLITE_PATH)
+    args = parser.parse_args()
+    unknown = set(args.tables) - set(TABLES)
+    if unknown:
+        parser.error(f"unknown table(s): {', '.join(sorted(unknown))}")
+    if args.direction == "compact":
+        for name in compact_logs(args.tables or None):
+            print(f"{name}: compacted")
+        raise SystemExit
+    run = import_csv if args.direction == "import" else export_csv
+    for name, rows in run(args.tables or None, args.db).items():
+        print(f"{name}: {rows} rows")
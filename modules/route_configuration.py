@@ -5,32 +5,33 @@ from dash import html, dcc, Input, Output, State, callback
 from dash.dependencies import ALL
 from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
+from modules.route_engine import insert_route, update_route, remove_route
+from modules.repository import (
+    TABLES,
+    delete_row,
+    get_row,
+    insert_row,
+    read_table,
+    table_exists,
+    table_key,
+    table_lock,
+    update_row,
+)
 
-CSV_PATH = "data/routes.csv"
-NOTIF_CSV_PATH = "data/notification.csv"
+CSV_PATH = TABLES["routes"].path
+NOTIF_CSV_PATH = TABLES["notifications"].path
 BLUE = "#2f80ed"
 
 os.makedirs("data", exist_ok=True)
 
-# ---------------- CSV Read / Write ----------------
+# ---------------- Read / Write ----------------
 def read_routes():
-    if os.path.exists(CSV_PATH):
-        df = pd.read_csv(CSV_PATH)
-        df["accessible"] = df["accessible"].apply(lambda x: True if str(x).lower() == "true" else False)
-        return df
+    if table_exists("routes"):
+        return read_table("routes")
     return pd.DataFrame(columns=["id", "start_location", "end_location", "distance_m", "accessible"])
 
-def save_routes(df):
-    df.to_csv(CSV_PATH, index=False)
-
 def add_notification(message, user_id=1):
-    if os.path.exists(NOTIF_CSV_PATH):
-        df = pd.read_csv(NOTIF_CSV_PATH)
-    else:
-        df = pd.DataFrame(columns=["id","user_id","message","delivered"])
-    new_id = int(df.id.max()) + 1 if not df.empty else 1
-    df = pd.concat([df, pd.DataFrame([{"id": new_id, "user_id": user_id, "message": message, "delivered": False}])], ignore_index=True)
-    df.to_csv(NOTIF_CSV_PATH, index=False)
+    insert_row("notifications", {"user_id": user_id, "message": message, "delivered": False})
 
 # ---------------- Table ----------------
 def generate_table(df):
@@ -272,25 +273,33 @@ def register_routes_callbacks(app):
         ctx = dash.callback_context
         trigger = ctx.triggered[0]["prop_id"]
 
-        df = read_routes()
-
         # Reset
         if trigger == "reset-btn.n_clicks":
-            return generate_table(df), "", "", None, None, "Add", None
+            return generate_table(read_routes()), "", "", None, None, "Add", None
 
         # Add / Update
         if not all([s,e]) or d is None or a is None:
             raise PreventUpdate
 
+        route = {"start_location":s,"end_location":e,"distance_m":d,"accessible":a}
+        # Held until the graph is patched, so the graph sees exactly the
+        # table before and after this write (see apply_route_change)
+        with table_lock("routes"):
+            before = table_key("routes")
+            if edit_id is not None:
+                old = get_row("routes", edit_id)
+                update_row("routes", edit_id, route)
+                df = read_routes()
+                update_route(df, old, route, before)
+            else:
+                insert_row("routes", route)
+                df = read_routes()
+                insert_route(df, route, before)
         if edit_id is not None:
-            df.loc[df.id == edit_id, ["start_location","end_location","distance_m","accessible"]] = [s,e,d,a]
             add_notification(f"Route '{s} → {e}' updated")
         else:
-            new_id = int(df.id.max())+1 if not df.empty else 1
-            df = pd.concat([df, pd.DataFrame([{"id":new_id,"start_location":s,"end_location":e,"distance_m":d,"accessible":a}])], ignore_index=True)
             add_notification(f"New route '{s} → {e}' added")
 
-        save_routes(df)
         return generate_table(df), "", "", None, None, "Add", None
 
     # ---------------- Edit ----------------
@@ -308,9 +317,8 @@ def register_routes_callbacks(app):
         if not any(clicks):
             raise PreventUpdate
         route_id = dash.callback_context.triggered_id["index"]
-        df = read_routes()
-        r = df[df.id==route_id].iloc[0]
-        return r.start_location, r.end_location, r.distance_m, r.accessible, "Update", route_id
+        r = get_row("routes", route_id)
+        return r["start_location"], r["end_location"], r["distance_m"], str(r["accessible"]).lower() == "true", "Update", route_id
 
     # ---------------- Delete ----------------
     @app.callback(
@@ -322,8 +330,12 @@ def register_routes_callbacks(app):
         if not any(clicks):
             raise PreventUpdate
         route_id = dash.callback_context.triggered_id["index"]
-        df = read_routes()
-        df = df[df.id != route_id]
-        save_routes(df)
+        with table_lock("routes"):
+            before = table_key("routes")
+            old = get_row("routes", route_id)
+            delete_row("routes", route_id)
+            df = read_routes()
+            if old is not None:
+                remove_route(df, old, before)
         add_notification(f"Route {route_id} deleted")
         return generate_table(df)
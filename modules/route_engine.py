@@ -0,0 +1,1246 @@
+import os
+import json
+import time
+import heapq
+import zipfile
+import threading
+from collections import OrderedDict, defaultdict, deque
+import numpy as np
+import pandas as pd
+
+from modules.repository import TABLES, read_table, table_fingerprint, table_key
+from modules.storage import atomic_write
+
+PATH_DATA = TABLES["routes"].path
+LOCATIONS_DATA = TABLES["locations"].path
+
+# Average walking speed in m/s
+WALKING_SPEED = 1.4
+
+# ---------------- Route Data ----------------
+def load_path_data():
+    # Typed by the routes schema (see repository.py): numeric distance_m,
+    # bool accessible, categorical start/end locations
+    return read_table("routes")
+
+# ---------------- Graph Normalisation ----------------
+def collapse_parallel_edges(df):
+    # Routes are undirected, so A-B and B-A are the same pair. Per pair keep
+    # the shortest accessible and the shortest inaccessible route, and drop
+    # the inaccessible one too when an accessible route is no longer: it can
+    # never be preferred by either kind of query. Self-loops are dropped.
+    # Returns (routes, provenance, report); provenance maps each kept route
+    # id to every route id it stands for.
+    df = df.dropna(subset=["start_location", "end_location", "distance_m"])
+    start = df["start_location"].astype(str)
+    end = df["end_location"].astype(str)
+    swap = start > end
+    work = pd.DataFrame({
+        "id": pd.to_numeric(df["id"], errors="coerce").fillna(-1).astype(np.int64).to_numpy(),
+        "start_location": start.where(~swap, end).to_numpy(),
+        "end_location": end.where(~swap, start).to_numpy(),
+        "distance_m": df["distance_m"].to_numpy(dtype=np.float64),
+        "accessible": df["accessible"].to_numpy(dtype=bool),
+    })
+
+    loops = work["start_location"] == work["end_location"]
+    work = work[~loops]
+
+    pair = ["start_location", "end_location"]
+    work = work.sort_values(pair + ["accessible", "distance_m", "id"], kind="stable")
+    work["group"] = work.groupby(pair + ["accessible"], sort=False).ngroup()
+    best = work.drop_duplicates("group")
+    parallel = len(work) - len(best)
+
+    accessible_best = best.loc[best["accessible"], pair + ["distance_m", "group"]]
+    best = best.merge(accessible_best, on=pair, how="left", suffixes=("", "_accessible"))
+    dominated = ~best["accessible"] & (best["distance_m_accessible"] <= best["distance_m"])
+
+    # Provenance: every id of a group goes to its kept route; the ids of a
+    # dominated inaccessible group go to the accessible route of that pair
+    owner = best["group"].where(~dominated, best["group_accessible"]).astype(np.int64)
+    winner_of_group = best.set_index("group")["id"]
+    group_owner = pd.Series(owner.to_numpy(), index=best["group"].to_numpy())
+    ids = work.groupby(work["group"].map(group_owner))["id"].agg(tuple)
+    ids.index = winner_of_group.reindex(ids.index).to_numpy()
+    provenance = {int(k): v for k, v in ids.items() if len(v) > 1}
+
+    kept = best.loc[~dominated, ["id"] + pair + ["distance_m", "accessible"]].reset_index(drop=True)
+    report = {
+        "routes": len(df),
+        "edges": len(kept),
+        "eliminated": len(df) - len(kept),
+        "parallel": parallel,
+        "dominated": int(dominated.sum()),
+        "self_loops": int(loops.sum()),
+    }
+    return kept, provenance, report
+
+# ---------------- Compact Graph ----------------
+# Edge flag bits stored per half-edge in RouteGraph.flags
+ACCESSIBLE = 1
+
+EARTH_RADIUS_M = 6371000.0
+
+class RouteGraph:
+    # Location names are interned to dense integer ids and the adjacency is
+    # stored in CSR layout: the half-edges leaving node u are
+    # targets/weights/flags/route_ids[offsets[u]:offsets[u + 1]].
+    # Every route is bidirectional, so it contributes two half-edges.
+
+    def __init__(self, names, offsets, targets, weights, flags, route_ids, index=None, coords=None):
+        self.names = list(names)
+        self.index = index if index is not None else {name: i for i, name in enumerate(self.names)}
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.flags = flags
+        self.route_ids = route_ids
+        # Optional (n, 2) planar x/y in metres, NaN where a location has none
+        self.coords = coords
+        # Filled by from_frame when parallel routes are collapsed
+        self.provenance = {}
+        self.normalisation = None
+        # Built on first use (or carried over by apply_route_change)
+        self._components = None
+        # (routes, locations) table keys of the data this graph was compiled
+        # from, set by get_route_graph / apply_route_change; artefacts
+        # derived from the graph are fingerprinted against it
+        self.source_key = None
+
+    @classmethod
+    def from_frame(cls, df, collapse=True):
+        provenance, report = {}, None
+        if collapse:
+            df, provenance, report = collapse_parallel_edges(df)
+        df = df.dropna(subset=["start_location", "end_location", "distance_m"])
+        m = len(df)
+
+        codes, names = pd.factorize(np.concatenate([
+            df["start_location"].astype(str).to_numpy(dtype=object),
+            df["end_location"].astype(str).to_numpy(dtype=object),
+        ]))
+        n = len(names)
+
+        src = np.concatenate([codes[:m], codes[m:]])
+        dst = np.concatenate([codes[m:], codes[:m]])
+        weights = np.tile(df["distance_m"].to_numpy(dtype=np.float64), 2)
+        flags = np.tile(np.where(df["accessible"].to_numpy(dtype=bool), ACCESSIBLE, 0).astype(np.uint8), 2)
+        route_ids = np.tile(pd.to_numeric(df["id"], errors="coerce").fillna(-1).to_numpy(dtype=np.int64), 2)
+
+        order = np.argsort(src, kind="stable")
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=offsets[1:])
+
+        graph = cls(
+            names.tolist(),
+            offsets,
+            dst[order].astype(np.int32),
+            weights[order],
+            flags[order],
+            route_ids[order],
+        )
+        graph.provenance = provenance
+        graph.normalisation = report
+        return graph
+
+    def subgraph(self, edge_mask):
+        # Same node ids, only the half-edges where edge_mask is True
+        src = np.repeat(np.arange(len(self.names)), np.diff(self.offsets))
+        offsets = np.zeros(len(self.offsets), dtype=np.int64)
+        np.cumsum(np.bincount(src[edge_mask], minlength=len(self.names)), out=offsets[1:])
+        sub = RouteGraph(
+            self.names,
+            offsets,
+            self.targets[edge_mask],
+            self.weights[edge_mask],
+            self.flags[edge_mask],
+            self.route_ids[edge_mask],
+            index=self.index,
+            coords=self.coords,
+        )
+        sub.provenance = self.provenance
+        sub.source_key = self.source_key
+        return sub
+
+    def accessible_subgraph(self):
+        return self.subgraph((self.flags & ACCESSIBLE) != 0)
+
+    def attach_coordinates(self, locations):
+        # Use x/y (metres) when present, otherwise project lat/lon onto a
+        # local plane. Either way straight-line distance never exceeds the
+        # walking distance, which keeps the A* heuristic admissible.
+        if {"x", "y"} <= set(locations.columns):
+            xy = locations[["name", "x", "y"]]
+        elif {"lat", "lon"} <= set(locations.columns):
+            lat0 = np.radians(pd.to_numeric(locations["lat"], errors="coerce").mean())
+            xy = pd.DataFrame({
+                "name": locations["name"],
+                "x": np.radians(pd.to_numeric(locations["lon"], errors="coerce")) * np.cos(lat0) * EARTH_RADIUS_M,
+                "y": np.radians(pd.to_numeric(locations["lat"], errors="coerce")) * EARTH_RADIUS_M,
+            })
+        else:
+            self.coords = None
+            return
+
+        xy = xy.dropna().drop_duplicates("name").set_index("name")
+        coords = xy.reindex(self.names)[["x", "y"]].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+        self.coords = coords if not np.isnan(coords).all() else None
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __iter__(self):
+        return iter(self.names)
+
+    @property
+    def components(self):
+        if self._components is None:
+            self._components = ComponentIndex.from_graph(self)
+        return self._components
+
+    def connected(self, a, b):
+        # False when either location is unknown
+        if a not in self.index or b not in self.index:
+            return False
+        return self.components.connected(self.index[a], self.index[b])
+
+    @property
+    def num_edges(self):
+        return len(self.targets)
+
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.offsets, self.targets, self.weights, self.flags, self.route_ids))
+
+    def edges_from(self, u):
+        lo, hi = int(self.offsets[u]), int(self.offsets[u + 1])
+        return zip(range(lo, hi), self.targets[lo:hi].tolist(), self.weights[lo:hi].tolist())
+
+    def _pair_edges(self, u, v):
+        lo, hi = int(self.offsets[u]), int(self.offsets[u + 1])
+        return lo + np.flatnonzero(self.targets[lo:hi] == v)
+
+    def best_edge(self, a, b):
+        # (weight, flags) of the cheapest edge between two locations,
+        # accessible first on ties; (inf, 0) when they are not adjacent
+        if a not in self.index or b not in self.index:
+            return float('inf'), 0
+        edges = self._pair_edges(self.index[a], self.index[b])
+        if not len(edges):
+            return float('inf'), 0
+        order = np.lexsort(((self.flags[edges] & ACCESSIBLE) == 0, self.weights[edges]))
+        e = edges[order[0]]
+        return float(self.weights[e]), int(self.flags[e])
+
+    def replace_pair(self, a, b, routes, provenance=None):
+        # Copy-on-write edit: a new graph whose edges between a and b are
+        # exactly the given routes (already collapsed). Other half-edges keep
+        # their order, so the cost is one memmove of the edge arrays rather
+        # than a rebuild; searches still running on this graph are unaffected.
+        # Unknown locations are appended as new node ids.
+        names, index, coords = self.names, self.index, self.coords
+        offsets = self.offsets.copy()
+        new_nodes = [name for name in dict.fromkeys((a, b)) if name not in index]
+        if new_nodes:
+            names = names + new_nodes
+            index = dict(index)
+            index.update((name, len(self.names) + i) for i, name in enumerate(new_nodes))
+            offsets = np.concatenate([offsets, np.repeat(offsets[-1], len(new_nodes))])
+            if coords is not None:
+                coords = np.vstack([coords, np.full((len(new_nodes), 2), np.nan)])
+        u, v = index[a], index[b]
+
+        removed = {u: np.empty(0, dtype=np.int64), v: np.empty(0, dtype=np.int64)}
+        if u < len(self.names) and v < len(self.names):
+            removed = {u: self._pair_edges(u, v), v: self._pair_edges(v, u)}
+        drop = np.concatenate(list(removed.values()))
+        old_ids = set(self.route_ids[drop].tolist())
+        for node, edges in removed.items():
+            offsets[node + 1:] -= len(edges)
+
+        k = len(routes)
+        weights = routes["distance_m"].to_numpy(dtype=np.float64)
+        flags = np.where(routes["accessible"].to_numpy(dtype=bool), ACCESSIBLE, 0).astype(np.uint8)
+        route_ids = pd.to_numeric(routes["id"], errors="coerce").fillna(-1).to_numpy(dtype=np.int64)
+        at = np.concatenate([np.repeat(offsets[u + 1], k), np.repeat(offsets[v + 1], k)])
+        for node in (u, v):
+            offsets[node + 1:] += k
+
+        graph = RouteGraph(
+            names,
+            offsets,
+            np.insert(np.delete(self.targets, drop), at, np.concatenate([np.full(k, v), np.full(k, u)]).astype(np.int32)),
+            np.insert(np.delete(self.weights, drop), at, np.tile(weights, 2)),
+            np.insert(np.delete(self.flags, drop), at, np.tile(flags, 2)),
+            np.insert(np.delete(self.route_ids, drop), at, np.tile(route_ids, 2)),
+            index=index,
+            coords=coords,
+        )
+        graph.provenance = {rid: ids for rid, ids in self.provenance.items() if rid not in old_ids}
+        graph.provenance.update(provenance or {})
+        graph.normalisation = self.normalisation
+        return graph
+
+# ---------------- Connected Components ----------------
+class ComponentIndex:
+    # Union-find over node ids. Two locations in different components have
+    # no route at all, which is answered with two find() calls instead of a
+    # search that exhausts the origin's whole component. New routes are
+    # unions; removing the last route between a pair runs a BFS from both
+    # ends at once and splits off the smaller side if they no longer meet.
+
+    def __init__(self, parent, size):
+        self.parent = parent
+        # Component size, valid at root ids only
+        self.size = size
+
+    @classmethod
+    def from_graph(cls, graph):
+        # Vectorised hook-and-jump: every edge hooks the larger of its two
+        # roots under the smaller, then pointer jumping flattens the trees.
+        # Converges in a few rounds, without a Python loop over edges.
+        n = len(graph)
+        src = np.repeat(np.arange(n), np.diff(graph.offsets))
+        dst = graph.targets.astype(np.int64)
+        parent = np.arange(n, dtype=np.int64)
+        while True:
+            pu, pv = parent[src], parent[dst]
+            split = pu != pv
+            if not split.any():
+                break
+            np.minimum.at(parent, np.maximum(pu[split], pv[split]), np.minimum(pu[split], pv[split]))
+            parent = _flatten(parent)
+        return cls(parent, np.bincount(parent, minlength=n).astype(np.int64))
+
+    def __len__(self):
+        return len(self.parent)
+
+    def find(self, u):
+        parent = self.parent
+        while parent[u] != u:
+            parent[u] = parent[parent[u]]
+            u = parent[u]
+        return int(u)
+
+    def connected(self, u, v):
+        return self.find(u) == self.find(v)
+
+    def labels(self):
+        # Root id of every node
+        self.parent = _flatten(self.parent)
+        return self.parent.copy()
+
+    def union(self, u, v):
+        ru, rv = self.find(u), self.find(v)
+        if ru == rv:
+            return
+        if self.size[ru] < self.size[rv]:
+            ru, rv = rv, ru
+        self.parent[rv] = ru
+        self.size[ru] += self.size[rv]
+
+    def split(self, graph, u, v):
+        # Called after the last edge between u and v is gone from graph
+        if not self.connected(u, v):
+            return
+        offsets, targets = graph.offsets, graph.targets
+        seen = ({u}, {v})
+        queues = (deque([u]), deque([v]))
+        while True:
+            for side in (0, 1):
+                if not queues[side]:
+                    self._detach(seen[side])
+                    return
+                x = queues[side].popleft()
+                for y in targets[offsets[x]:offsets[x + 1]].tolist():
+                    if y in seen[1 - side]:
+                        return
+                    if y not in seen[side]:
+                        seen[side].add(y)
+                        queues[side].append(y)
+
+    def _detach(self, nodes):
+        # nodes is a whole component of the current graph: give it its own
+        # root and re-root whatever is left of the component it came from
+        self.parent = _flatten(self.parent)
+        nodes = np.fromiter(nodes, dtype=np.int64, count=len(nodes))
+        members = np.flatnonzero(self.parent == self.parent[nodes[0]])
+        rest = np.setdiff1d(members, nodes, assume_unique=True)
+        for part in (nodes, rest):
+            if len(part):
+                root = part.min()
+                self.parent[part] = root
+                self.size[root] = len(part)
+
+    def updated(self, graph, changes):
+        # Copy for graph (the result of replace_pair edits), given the
+        # (a, b, before, after) best_edge tuples that apply_route_change
+        # records; the original keeps serving searches on the old graph
+        n = len(graph)
+        parent = np.arange(n, dtype=np.int64)
+        size = np.ones(n, dtype=np.int64)
+        parent[:len(self.parent)] = self.parent
+        size[:len(self.size)] = self.size
+        index = ComponentIndex(parent, size)
+        for a, b, before, after in changes:
+            u, v = graph.index[a], graph.index[b]
+            if np.isfinite(after[0]):
+                index.union(u, v)
+            elif np.isfinite(before[0]):
+                index.split(graph, u, v)
+        return index
+
+def _flatten(parent):
+    while True:
+        grand = parent[parent]
+        if np.array_equal(grand, parent):
+            return parent
+        parent = grand
+
+def _dijkstra(graph, source, target=None, stats=None, until=None, first_of=None):
+    # Parent-pointer Dijkstra over node ids. dist/pred are dicts so a
+    # point-to-point query only pays for the nodes it actually touches.
+    # until: stop once every node id in this collection is settled;
+    # first_of: stop at the first settled node id of this collection.
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    dist = {source: 0.0}
+    pred = {}
+    pq = [(0.0, source)]
+    inf = float('inf')
+    settled = 0
+    remaining = set(until) if until is not None else None
+    stop = set(first_of) if first_of is not None else {target}
+
+    while pq:
+        d, u = heapq.heappop(pq)
+        if d > dist[u]:
+            continue
+        settled += 1
+        if u in stop:
+            break
+        if remaining is not None:
+            remaining.discard(u)
+            if not remaining:
+                break
+
+        lo, hi = int(offsets[u]), int(offsets[u + 1])
+        for e, v, w in zip(range(lo, hi), targets[lo:hi].tolist(), weights[lo:hi].tolist()):
+            nd = d + w
+            if nd < dist.get(v, inf):
+                dist[v] = nd
+                pred[v] = (u, e)
+                heapq.heappush(pq, (nd, v))
+
+    if stats is not None:
+        stats["settled"] = stats.get("settled", 0) + settled
+    return dist, pred
+
+def _bidirectional(graph, source, target, stats=None):
+    # Grow a forward search from the source and a backward search from the
+    # target (the graph is undirected, so both use the same adjacency),
+    # always expanding the smaller frontier, and stop once the two cannot
+    # improve on the best meeting point found so far.
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    inf = float('inf')
+    dist = ({source: 0.0}, {target: 0.0})
+    pred = ({}, {})
+    pq = ([(0.0, source)], [(0.0, target)])
+    best, meet = inf, None
+    settled = 0
+
+    while pq[0] and pq[1]:
+        if pq[0][0][0] + pq[1][0][0] >= best:
+            break
+        side = 0 if len(pq[0]) <= len(pq[1]) else 1
+        d, u = heapq.heappop(pq[side])
+        if d > dist[side][u]:
+            continue
+        settled += 1
+
+        own, other = dist[side], dist[1 - side]
+        lo, hi = int(offsets[u]), int(offsets[u + 1])
+        for e, v, w in zip(range(lo, hi), targets[lo:hi].tolist(), weights[lo:hi].tolist()):
+            nd = d + w
+            if nd < own.get(v, inf):
+                own[v] = nd
+                pred[side][v] = (u, e)
+                heapq.heappush(pq[side], (nd, v))
+            if v in other and nd + other[v] < best:
+                best, meet = nd + other[v], v
+
+    if stats is not None:
+        stats["settled"] = stats.get("settled", 0) + settled
+    if meet is None:
+        return None
+
+    nodes, edges = unwind_path(graph, pred[0], source, meet)
+    back_nodes, back_edges = unwind_path(graph, pred[1], target, meet)
+    return best, nodes + back_nodes[::-1][1:], edges + back_edges[::-1]
+
+def _astar(graph, source, target, stats=None):
+    # Dijkstra ordered by g + straight-line distance to the target. Nodes
+    # without coordinates get h = 0, which is still admissible; stale heap
+    # entries are skipped rather than using a closed set, so a node can be
+    # re-expanded if a shorter way to it turns up later.
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    coords = graph.coords
+    tx, ty = coords[target]
+    h_cache = {}
+
+    def h(v):
+        if v not in h_cache:
+            x, y = coords[v]
+            h_cache[v] = 0.0 if x != x or y != y else ((x - tx) ** 2 + (y - ty) ** 2) ** 0.5
+        return h_cache[v]
+
+    inf = float('inf')
+    dist = {source: 0.0}
+    pred = {}
+    pq = [(h(source), 0.0, source)]
+    settled = 0
+
+    while pq:
+        _, d, u = heapq.heappop(pq)
+        if d > dist[u]:
+            continue
+        settled += 1
+        if u == target:
+            break
+
+        lo, hi = int(offsets[u]), int(offsets[u + 1])
+        for e, v, w in zip(range(lo, hi), targets[lo:hi].tolist(), weights[lo:hi].tolist()):
+            nd = d + w
+            if nd < dist.get(v, inf):
+                dist[v] = nd
+                pred[v] = (u, e)
+                heapq.heappush(pq, (nd + h(v), nd, v))
+
+    if stats is not None:
+        stats["settled"] = stats.get("settled", 0) + settled
+    if target not in dist:
+        return None
+    nodes, edges = unwind_path(graph, pred, source, target)
+    return dist[target], nodes, edges
+
+def shortest_path_tree(graph, source, stats=None, until=None):
+    # Distances and (parent, half-edge) pointers from source to every
+    # reachable node id, or only until the node ids in until are settled
+    # (other entries of dist may then still be tentative)
+    return _dijkstra(graph, source, None, stats, until)
+
+def unwind_path(graph, pred, source, target):
+    # (node ids, half-edge ids) from source to target, following the
+    # (parent, half-edge) pointers of a search
+    nodes = [target]
+    edges = []
+    while nodes[-1] != source:
+        u, e = pred[nodes[-1]]
+        nodes.append(u)
+        edges.append(e)
+    nodes.reverse()
+    edges.reverse()
+    return nodes, edges
+
+SEARCH_STRATEGIES = ("auto", "dijkstra", "bidirectional", "astar")
+
+def resolve_strategy(graph, end, strategy="auto"):
+    # A* needs a coordinate for the destination; otherwise its heuristic is
+    # zero everywhere and it degenerates to plain Dijkstra
+    has_coords = graph.coords is not None and end in graph and not np.isnan(graph.coords[graph.index[end]]).any()
+    if strategy == "astar" and not has_coords:
+        return "bidirectional"
+    if strategy == "auto":
+        return "astar" if has_coords else "bidirectional"
+    return strategy
+
+def shortest_path(graph, start, end, strategy="dijkstra", stats=None):
+    if stats is not None:
+        stats["settled"] = 0
+    if start not in graph or end not in graph:
+        return None, [], []
+
+    s, t = graph.index[start], graph.index[end]
+    if s == t:
+        return 0.0, [start], []
+    if not graph.components.connected(s, t):
+        if stats is not None:
+            stats["strategy"] = "component index"
+        return None, [], []
+    strategy = resolve_strategy(graph, end, strategy)
+    if stats is not None:
+        stats["strategy"] = strategy
+
+    if strategy == "bidirectional":
+        found = _bidirectional(graph, s, t, stats)
+    elif strategy == "astar":
+        found = _astar(graph, s, t, stats)
+    else:
+        dist, pred = _dijkstra(graph, s, t, stats)
+        found = (dist[t], *unwind_path(graph, pred, s, t)) if t in dist else None
+
+    if found is None:
+        return None, [], []
+    return as_route(graph, *found)
+
+def as_route(graph, dist, nodes, edges):
+    # The (dist, path, access_flags) triple every route query returns
+    path = [graph.names[u] for u in nodes]
+    access_flags = [bool(graph.flags[e] & ACCESSIBLE) for e in edges]
+    return dist, path, access_flags
+
+def nearest_target(graph, start, targets, stats=None):
+    # Route to whichever of targets is closest, from a single search that
+    # stops at the first target it settles. Returns (dist, path,
+    # access_flags, target name); (None, [], [], None) when none is reachable.
+    if stats is not None:
+        stats["settled"] = 0
+        stats["strategy"] = "multi-target dijkstra"
+    if start not in graph:
+        return None, [], [], None
+    s = graph.index[start]
+    ids = {graph.index[t] for t in targets if graph.connected(start, t)}
+    if not ids:
+        return None, [], [], None
+    dist, pred = _dijkstra(graph, s, stats=stats, first_of=ids)
+    reached = [t for t in ids if t in dist]
+    if not reached:
+        return None, [], [], None
+    # Any unsettled target still has a tentative distance no lower than
+    # the settled one, so the minimum is the target the search stopped at
+    t = min(reached, key=dist.get)
+    return (*as_route(graph, dist[t], *unwind_path(graph, pred, s, t)), graph.names[t])
+
+# ---------------- Reachability ----------------
+def reachable_within(graph, start, max_dist, stats=None):
+    # Truncated Dijkstra: every location within max_dist of start as
+    # (name, distance) pairs, nearest first. Nothing beyond the bound is
+    # ever pushed, so the cost depends on the size of the answer only.
+    if stats is not None:
+        stats["settled"] = 0
+        stats["strategy"] = "truncated dijkstra"
+    if start not in graph or max_dist < 0:
+        return []
+    offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+    source = graph.index[start]
+    dist = {source: 0.0}
+    pq = [(0.0, source)]
+    inf = float('inf')
+    order = []
+
+    while pq:
+        d, u = heapq.heappop(pq)
+        if d > dist[u]:
+            continue
+        order.append(u)
+        lo, hi = int(offsets[u]), int(offsets[u + 1])
+        for v, w in zip(targets[lo:hi].tolist(), weights[lo:hi].tolist()):
+            nd = d + w
+            if nd <= max_dist and nd < dist.get(v, inf):
+                dist[v] = nd
+                heapq.heappush(pq, (nd, v))
+
+    if stats is not None:
+        stats["settled"] = len(order)
+    return [(graph.names[u], dist[u]) for u in order]
+
+# ---------------- Alternative Routes ----------------
+# Yen's K-shortest loopless paths. The shortest-path tree towards the
+# destination is computed once and reused by every spur search: its
+# distances are an exact lower bound (so spur searches run as A*), and
+# whenever the tree path from a spur node avoids the banned nodes/edges
+# it *is* the spur path and no search is needed at all.
+MAX_SETTLED_PER_QUERY = 200000
+
+def _tree_path(tree_pred, source, target, banned_nodes, banned_pairs):
+    nodes, edges = [source], []
+    u = source
+    while u != target:
+        v, e = tree_pred[u]
+        if v in banned_nodes or (u, v) in banned_pairs:
+            return None
+        nodes.append(v)
+        edges.append(e)
+        u = v
+    return nodes, edges
+
+def _spur_search(graph, source, target, h, banned_nodes, banned_pairs, budget):
+    dist = {source: 0.0}
+    pred = {}
+    settled = set()
+    pq = [(h[source], 0.0, source)]
+
+    while pq:
+        _, d, u = heapq.heappop(pq)
+        if u in settled:
+            continue
+        if budget[0] <= 0:
+            return None
+        budget[0] -= 1
+        settled.add(u)
+        if u == target:
+            nodes, edges = unwind_path(graph, pred, source, target)
+            return d, nodes, edges
+
+        for e, v, w in graph.edges_from(u):
+            if v in banned_nodes or (u, v) in banned_pairs or v not in h:
+                continue
+            nd = d + w
+            if nd < dist.get(v, float('inf')):
+                dist[v] = nd
+                pred[v] = (u, e)
+                heapq.heappush(pq, (nd + h[v], nd, v))
+
+    return None
+
+def k_shortest_paths(graph, start, end, k=3, max_settled=MAX_SETTLED_PER_QUERY, stats=None):
+    if stats is None:
+        stats = {}
+    stats.update(settled=0, truncated=False)
+    if start == end or not graph.connected(start, end):
+        return []
+
+    s, t = graph.index[start], graph.index[end]
+    # The graph is undirected, so the tree grown from the destination gives
+    # every node's distance *to* it and a next hop towards it.
+    h, tree_pred = _dijkstra(graph, t)
+    budget = [max_settled - len(h)]
+    if s not in h:
+        stats["settled"] = len(h)
+        return []
+
+    first_nodes, first_edges = _tree_path(tree_pred, s, t, set(), set())
+    accepted = [(h[s], first_nodes, first_edges)]
+    seen = {tuple(first_nodes)}
+    candidates = []
+
+    while len(accepted) < k:
+        _, prev_nodes, prev_edges = accepted[-1]
+        root_cost = 0.0
+        for i in range(len(prev_nodes) - 1):
+            spur = prev_nodes[i]
+            root_nodes = prev_nodes[:i + 1]
+            banned_nodes = set(root_nodes[:-1])
+            banned_pairs = {
+                (nodes[i], nodes[i + 1])
+                for _, nodes, _ in accepted
+                if len(nodes) > i + 1 and nodes[:i + 1] == root_nodes
+            }
+
+            spur_route = _tree_path(tree_pred, spur, t, banned_nodes, banned_pairs)
+            if spur_route is not None:
+                spur_cost = h[spur]
+                spur_nodes, spur_edges = spur_route
+            else:
+                found = _spur_search(graph, spur, t, h, banned_nodes, banned_pairs, budget)
+                if found is None:
+                    if budget[0] <= 0:
+                        stats["truncated"] = True
+                        break
+                    root_cost += float(graph.weights[prev_edges[i]])
+                    continue
+                spur_cost, spur_nodes, spur_edges = found
+
+            nodes = root_nodes + spur_nodes[1:]
+            if tuple(nodes) not in seen:
+                seen.add(tuple(nodes))
+                heapq.heappush(candidates, (root_cost + spur_cost, nodes, prev_edges[:i] + spur_edges))
+            root_cost += float(graph.weights[prev_edges[i]])
+
+        if stats["truncated"] or not candidates:
+            break
+        accepted.append(heapq.heappop(candidates))
+
+    stats["settled"] = max_settled - budget[0]
+    return [as_route(graph, dist, nodes, edges) for dist, nodes, edges in accepted]
+
+# ---------------- Multi-Criteria Routes ----------------
+# Label-setting search over (distance, inaccessible segments, floor
+# changes). A node keeps every settled label that no other label at it
+# beats on all three criteria; labels are popped in A* order on distance
+# (lower bounds from one tree grown from the destination), and a label is
+# dropped as soon as a route already found to the destination is at least
+# as good on every criterion as anything the label could still become.
+MAX_PARETO_LABELS = 200000
+
+def _dominated(front, d, b, f):
+    for fd, fb, ff in front:
+        if fd <= d and fb <= b and ff <= f:
+            return True
+    return False
+
+def pareto_routes(graph, start, end, floor_changes=None, max_labels=MAX_PARETO_LABELS, stats=None):
+    # Every Pareto-optimal route as (dist, path, access_flags, floor
+    # changes), shortest first. floor_changes is an optional per-half-edge
+    # count of floors climbed or descended (see BuildingRouter); without
+    # it only distance and inaccessible segments are traded off.
+    if stats is None:
+        stats = {}
+    stats.update(settled=0, strategy="pareto labels", truncated=False)
+    if start == end and start in graph:
+        return [(0.0, [start], [], 0)]
+    if not graph.connected(start, end):
+        return []
+
+    s, t = graph.index[start], graph.index[end]
+    offsets, targets, weights, flags = graph.offsets, graph.targets, graph.weights, graph.flags
+    h, _ = _dijkstra(graph, t)
+
+    # labels[i] = (node, parent label, half-edge, distance so far)
+    labels = [(s, -1, -1, 0.0)]
+    fronts = defaultdict(list)
+    found = []
+    pq = [(h[s], 0, 0, 0)]
+    settled = 0
+
+    while pq:
+        key, b, f, i = heapq.heappop(pq)
+        u, d = labels[i][0], labels[i][3]
+        if _dominated(fronts[t], key, b, f) or _dominated(fronts[u], d, b, f):
+            continue
+        fronts[u].append((d, b, f))
+        settled += 1
+        if u == t:
+            found.append((d, f, i))
+            continue
+        if settled >= max_labels:
+            stats["truncated"] = True
+            break
+
+        lo, hi = int(offsets[u]), int(offsets[u + 1])
+        climbs = floor_changes[lo:hi].tolist() if floor_changes is not None else [0] * (hi - lo)
+        for e, v, w, fl, c in zip(range(lo, hi), targets[lo:hi].tolist(), weights[lo:hi].tolist(), flags[lo:hi].tolist(), climbs):
+            nd, nb, nf = d + w, b + (0 if fl & ACCESSIBLE else 1), f + c
+            if _dominated(fronts[t], nd + h[v], nb, nf) or _dominated(fronts[v], nd, nb, nf):
+                continue
+            labels.append((v, i, e, nd))
+            heapq.heappush(pq, (nd + h[v], nb, nf, len(labels) - 1))
+
+    stats["settled"] = settled
+    routes = []
+    for d, climbed, i in found:
+        nodes, edges = [], []
+        while i >= 0:
+            u, i, e, _ = labels[i]
+            nodes.append(u)
+            if e >= 0:
+                edges.append(e)
+        routes.append((*as_route(graph, d, nodes[::-1], edges[::-1]), climbed))
+    return routes
+
+# ---------------- Graph Cache ----------------
+# One graph per process, rebuilt only when the routes table changes.
+# The key combines the table key with a version counter that every route
+# edit made in this process (and bump_routes_version) advances, so those
+# edits are picked up even when the filesystem mtime resolution hides them.
+# The accessible-only view is precomputed next to the full graph so
+# wheelchair queries never see (or explore) an inaccessible edge.
+# Single-route edits from the admin pages go through insert_route /
+# update_route / remove_route instead, which patch both graphs in place of
+# a rebuild and tell listeners exactly which location pairs changed. The
+# page holds table_lock("routes") from just before the write until the
+# graph is patched, so no other worker's write falls in between unseen.
+_graph_lock = threading.Lock()
+_graph_cache = {"key": None, "graph": None, "accessible": None}
+_routes_version = 0
+
+GRAPH_CACHE_STATS = {
+    "hits": 0,
+    "misses": 0,
+    "rebuilds": 0,
+    "updates": 0,
+    "edges_eliminated": 0,
+    "snapshot_loads": 0,
+    "snapshot_saves": 0,
+}
+
+# Callables run (outside the lock) after every route-table change, for
+# precomputed structures that live outside this module. They are called as
+# fn(version, change): change is None when everything must be assumed
+# stale, otherwise the dict built by apply_route_change.
+_routes_listeners = []
+
+def on_routes_changed(fn):
+    _routes_listeners.append(fn)
+    return fn
+
+def _notify_routes_changed(version, change=None):
+    for fn in list(_routes_listeners):
+        fn(version, change)
+    return version
+
+def bump_routes_version():
+    global _routes_version
+    with _graph_lock:
+        _routes_version += 1
+        version = _routes_version
+    return _notify_routes_changed(version)
+
+def routes_version():
+    return _routes_version
+
+class BackgroundRebuild:
+    # Runs fn in a daemon thread when called. Calls that arrive while a run
+    # is in progress are folded into a single follow-up run, so a burst of
+    # route edits costs at most two rebuilds.
+
+    def __init__(self, name, fn):
+        self.name = name
+        self.fn = fn
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pending = False
+
+    def __call__(self, version=None, change=None):
+        with self._lock:
+            if self._thread is not None:
+                self._pending = True
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                self._pending = False
+            try:
+                self.fn()
+            except Exception as e:
+                print(f"Error in {self.name}: {e}")
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+
+def routes_change_key():
+    return table_key("routes"), _routes_version
+
+def graph_source_key():
+    # Routes plus locations: locations contribute coordinates (a moved
+    # location changes the A* heuristic) and buildings/floors
+    return table_key("routes"), table_key("locations")
+
+def graph_change_key():
+    return (*graph_source_key(), _routes_version)
+
+def routes_fingerprint():
+    # Content identity of the routes table, for artefacts persisted on disk
+    # that must be checked against it across processes and restarts
+    return table_fingerprint("routes")
+
+def graph_fingerprint():
+    # The compiled graph also takes coordinates from the locations table
+    return f"{routes_fingerprint()}:{table_fingerprint('locations')}"
+
+def source_fingerprints(source_key):
+    # (routes, locations) fingerprints of the tables a graph was compiled
+    # from, given its source_key, or None when either table has been
+    # written since: an artefact derived from that graph must not be
+    # persisted under the fingerprint of newer data
+    if source_key is None or graph_source_key() != source_key:
+        return None
+    fingerprints = routes_fingerprint(), table_fingerprint("locations")
+    return fingerprints if graph_source_key() == source_key else None
+
+def load_locations():
+    return read_table("locations")
+
+def get_route_graph(accessible_only=False):
+    slot = "accessible" if accessible_only else "graph"
+    key = graph_change_key()
+    with _graph_lock:
+        if _graph_cache["key"] == key:
+            GRAPH_CACHE_STATS["hits"] += 1
+            return _graph_cache[slot]
+
+        GRAPH_CACHE_STATS["misses"] += 1
+        if _graph_cache["key"] is not None:
+            GRAPH_CACHE_STATS["rebuilds"] += 1
+
+        # The key is taken before loading, so a table written meanwhile makes
+        # the graph look older than it is: the next lookup recompiles it and
+        # save_graph_snapshot refuses to tag it with the newer fingerprint
+        snapshot = load_graph_snapshot()
+        if snapshot is not None:
+            graph, accessible = snapshot
+            GRAPH_CACHE_STATS["snapshot_loads"] += 1
+        else:
+            graph = RouteGraph.from_frame(load_path_data())
+            graph.attach_coordinates(load_locations())
+            accessible = graph.accessible_subgraph()
+            # Component indexes are built with the graphs rather than on the
+            # first query, and from then on patched by apply_route_change
+            for g in (graph, accessible):
+                g._components = ComponentIndex.from_graph(g)
+            schedule_snapshot()
+        graph.source_key = accessible.source_key = key[:2]
+        GRAPH_CACHE_STATS["edges_eliminated"] = graph.normalisation.get("eliminated", 0)
+        _graph_cache["key"] = key
+        _graph_cache["graph"] = graph
+        _graph_cache["accessible"] = accessible
+        return _graph_cache[slot]
+
+# ---------------- Graph Snapshot ----------------
+# The compiled graph (interned names, CSR arrays, coordinates, provenance
+# and the component labels of both views) is kept in one .npz next to
+# routes.csv, tagged with content hashes of routes.csv and locations.csv.
+# A worker starting against unchanged CSVs loads it instead of parsing and
+# compiling them; a missing, stale or unreadable snapshot is ignored and
+# rewritten in the background after the graph is rebuilt or routes change.
+# Distance tables and the contraction hierarchy persist themselves the
+# same way (see distance_table.py and contraction.py).
+#
+# Build offline with:  python -m modules.route_engine
+GRAPH_SNAPSHOT_PATH = os.path.splitext(PATH_DATA)[0] + ".graph.npz"
+GRAPH_SNAPSHOT_FORMAT = 1
+
+def save_graph_snapshot(path=None):
+    path = path or GRAPH_SNAPSHOT_PATH
+    get_route_graph()
+    with _graph_lock:
+        graph, accessible = _graph_cache["graph"], _graph_cache["accessible"]
+    # Tagged with the fingerprint of the tables the graph was compiled
+    # from; when they have been written since, the write itself schedules
+    # another save
+    fingerprints = source_fingerprints(graph.source_key)
+    if fingerprints is None:
+        return False
+    fingerprint = ":".join(fingerprints)
+
+    provenance = graph.provenance
+    members = [np.asarray(ids, dtype=np.int64) for ids in provenance.values()]
+    atomic_write(path, lambda f: np.savez(
+        f,
+        format=np.array(GRAPH_SNAPSHOT_FORMAT),
+        fingerprint=np.array(fingerprint),
+        names=np.array(graph.names, dtype=str),
+        offsets=graph.offsets,
+        targets=graph.targets,
+        weights=graph.weights,
+        flags=graph.flags,
+        route_ids=graph.route_ids,
+        coords=graph.coords if graph.coords is not None else np.empty((0, 2)),
+        provenance_ids=np.fromiter(provenance.keys(), dtype=np.int64, count=len(provenance)),
+        provenance_counts=np.array([len(m) for m in members], dtype=np.int64),
+        provenance_members=np.concatenate(members) if members else np.empty(0, dtype=np.int64),
+        normalisation=np.array(json.dumps(graph.normalisation or {})),
+        components=graph.components.labels(),
+        component_sizes=graph.components.size,
+        accessible_components=accessible.components.labels(),
+        accessible_component_sizes=accessible.components.size,
+    ))
+    GRAPH_CACHE_STATS["snapshot_saves"] += 1
+    return True
+
+def load_graph_snapshot(path=None):
+    # (graph, accessible graph), or None when the snapshot is missing,
+    # unreadable, from another format version or built from other CSVs
+    path = path or GRAPH_SNAPSHOT_PATH
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            if int(data["format"]) != GRAPH_SNAPSHOT_FORMAT or str(data["fingerprint"]) != graph_fingerprint():
+                return None
+            coords = data["coords"]
+            graph = RouteGraph(
+                data["names"].tolist(),
+                data["offsets"],
+                data["targets"],
+                data["weights"],
+                data["flags"],
+                data["route_ids"],
+                coords=coords if len(coords) else None,
+            )
+            members = np.split(data["provenance_members"], np.cumsum(data["provenance_counts"])[:-1])
+            graph.provenance = {int(rid): tuple(m.tolist()) for rid, m in zip(data["provenance_ids"], members)}
+            graph.normalisation = json.loads(str(data["normalisation"]))
+            graph._components = ComponentIndex(data["components"], data["component_sizes"])
+            accessible = graph.accessible_subgraph()
+            accessible._components = ComponentIndex(data["accessible_components"], data["accessible_component_sizes"])
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+    return graph, accessible
+
+# ---------------- Incremental Updates ----------------
+def _pair_routes(routes, a, b):
+    # Hash lookups rather than string comparisons; a-a and b-b self-loops
+    # that slip through are dropped by collapse_parallel_edges
+    pair = [a, b]
+    return routes[routes["start_location"].isin(pair) & routes["end_location"].isin(pair)]
+
+def _patched_normalisation(routes, graph):
+    # collapse_parallel_edges totals for a patched graph: every kept route
+    # is one edge pair in the graph. The parallel / dominated / self-loop
+    # breakdown is only known after a full rebuild.
+    valid = int(routes[["start_location", "end_location", "distance_m"]].notna().all(axis=1).sum())
+    edges = graph.num_edges // 2
+    return {"routes": valid, "edges": edges, "eliminated": valid - edges}
+
+def apply_route_change(routes, pairs, base_key=None):
+    # Re-derive the edges of the given location pairs from the saved routes
+    # table (the whole table after the edit) and patch the cached graphs.
+    # Call after the table has been written, still holding
+    # table_lock("routes"), with base_key the routes table key read under
+    # that lock right before the write. Only graphs compiled from exactly
+    # that table are patched: one compiled earlier would miss writes from
+    # other processes. Anything else (or base_key None) falls back to a
+    # plain version bump, so the graphs are rebuilt.
+    global _routes_version
+    routes_key, locations_key = graph_source_key()
+    with _graph_lock:
+        if base_key is None or _graph_cache["key"] != (base_key, locations_key, _routes_version):
+            change = None
+        else:
+            graph, accessible = _graph_cache["graph"], _graph_cache["accessible"]
+            components = graph.components, accessible.components
+            change = {"full": [], "accessible": []}
+            for a, b in {tuple(sorted((str(a), str(b)))) for a, b in pairs}:
+                if a == b:
+                    continue
+                kept, provenance, _ = collapse_parallel_edges(_pair_routes(routes, a, b))
+                before = graph.best_edge(a, b), accessible.best_edge(a, b)
+                graph = graph.replace_pair(a, b, kept, provenance)
+                accessible = accessible.replace_pair(a, b, kept[kept["accessible"]], provenance)
+                change["full"].append((a, b, before[0], graph.best_edge(a, b)))
+                change["accessible"].append((a, b, before[1], accessible.best_edge(a, b)))
+            graph._components = components[0].updated(graph, change["full"])
+            accessible._components = components[1].updated(accessible, change["accessible"])
+            graph.source_key = accessible.source_key = routes_key, locations_key
+            graph.normalisation = _patched_normalisation(routes, graph)
+            change["graph"], change["accessible_graph"] = graph, accessible
+            change["base_key"], change["routes_key"] = base_key, routes_key
+        _routes_version += 1
+        version = _routes_version
+        if change is not None:
+            _graph_cache["key"] = (routes_key, locations_key, version)
+            _graph_cache["graph"] = change["graph"]
+            _graph_cache["accessible"] = change["accessible_graph"]
+            GRAPH_CACHE_STATS["updates"] += 1
+            GRAPH_CACHE_STATS["edges_eliminated"] = change["graph"].normalisation["eliminated"]
+    return _notify_routes_changed(version, change)
+
+def _route_pair(route):
+    return route["start_location"], route["end_location"]
+
+def insert_route(routes, route, base_key=None):
+    return apply_route_change(routes, [_route_pair(route)], base_key)
+
+def update_route(routes, old, new, base_key=None):
+    return apply_route_change(routes, [_route_pair(old), _route_pair(new)], base_key)
+
+def remove_route(routes, route, base_key=None):
+    return apply_route_change(routes, [_route_pair(route)], base_key)
+
+def graph_cache_stats():
+    with _graph_lock:
+        stats = dict(GRAPH_CACHE_STATS)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+    stats["version"] = _routes_version
+    return stats
+
+# ---------------- Connectivity Report ----------------
+def isolated_locations():
+    # Data-quality report: every location cut off from the main (largest)
+    # component of the route network, as a DataFrame of location, issue
+    # and component_size (number of locations reachable from it, itself
+    # included). Locations that are only reachable using stairs are listed
+    # separately from those with no route at all.
+    graph = get_route_graph()
+    accessible = get_route_graph(accessible_only=True)
+    rows = []
+
+    names = load_locations()["name"].dropna().astype(str).unique()
+    rows.extend((name, "no routes", 1) for name in names if name not in graph)
+
+    reported = np.zeros(len(graph), dtype=bool)
+    for g, issue in ((graph, "disconnected from the main network"), (accessible, "no step-free route to the main network")):
+        if not len(g):
+            continue
+        labels = g.components.labels()
+        sizes = np.bincount(labels, minlength=len(g))
+        cut_off = np.flatnonzero((labels != np.argmax(sizes)) & ~reported)
+        rows.extend((g.names[u], issue, int(sizes[labels[u]])) for u in cut_off)
+        reported[cut_off] = True
+
+    report = pd.DataFrame(rows, columns=["location", "issue", "component_size"])
+    return report.sort_values(["issue", "component_size", "location"], ignore_index=True)
+
+def component_summary():
+    # Number of components and size of the largest, for both graphs
+    summary = {}
+    for slot, accessible_only in (("full", False), ("accessible", True)):
+        g = get_route_graph(accessible_only=accessible_only)
+        sizes = np.bincount(g.components.labels(), minlength=len(g))
+        sizes = sizes[sizes > 0]
+        summary[slot] = {"components": len(sizes), "largest": int(sizes.max()) if len(sizes) else 0}
+    return summary
+
+# ---------------- Route Result Cache ----------------
+# Popular origin/destination pairs are answered from an LRU cache. Keys
+# include routes_change_key(), so a route edit makes every older entry
+# unreachable at the moment the version is bumped; the listener below then
+# drops them to free the memory.
+ROUTE_CACHE_SIZE = 2048
+ROUTE_CACHE_TTL = 600
+
+class LRUCache:
+
+    def __init__(self, maxsize=ROUTE_CACHE_SIZE, ttl=ROUTE_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] < now:
+                del self._data[key]
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return default
+            self._data.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self, version=None, change=None):
+        with self._lock:
+            self._data.clear()
+            self._stats["invalidations"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, size=len(self._data), maxsize=self.maxsize)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+ROUTE_RESULT_CACHE = LRUCache()
+on_routes_changed(ROUTE_RESULT_CACHE.clear)
+
+def route_cache_stats():
+    return ROUTE_RESULT_CACHE.stats()
+
+schedule_snapshot = BackgroundRebuild("graph-snapshot", save_graph_snapshot)
+on_routes_changed(schedule_snapshot)
+
+if __name__ == "__main__":
+    save_graph_snapshot()
+    graph = load_graph_snapshot()[0]
+    print(f"{GRAPH_SNAPSHOT_PATH}: {len(graph)} locations, {graph.num_edges} half-edges, {os.path.getsize(GRAPH_SNAPSHOT_PATH) / 2**20:.1f} MiB")
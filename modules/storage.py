@@ -0,0 +1,123 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single-process use only
+    fcntl = None
+
+# File helpers shared by every module that writes under data/, so several
+# app workers can run against the same directory:
+#
+#   atomic_write  the new contents go to a temporary file in the same
+#                 directory, are fsynced and then renamed over the target,
+#                 so a reader sees either the old file or the new one,
+#                 never a truncated one.
+#   file_lock     advisory fcntl lock on a "<path>.lock" side file, held
+#                 around read-modify-write cycles (exclusive) or reads that
+#                 must see two files consistently (shared). Time spent
+#                 waiting is recorded per lock; see lock_stats().
+
+LOCK_SUFFIX = ".lock"
+
+LOCK_STATS = {}
+_stats_lock = threading.Lock()
+
+# flock locks belong to the open file, so two threads of one process
+# opening the lock file separately would block each other like two
+# processes would; an in-process lock per path is taken first so threads
+# queue here and each process holds at most one flock per path
+_thread_locks = {}
+
+def _thread_lock(path):
+    with _stats_lock:
+        if path not in _thread_locks:
+            _thread_locks[path] = threading.RLock()
+        return _thread_locks[path]
+
+# Paths this thread already holds, with their nesting depth
+_held = threading.local()
+
+def _record_wait(name, waited):
+    with _stats_lock:
+        stats = LOCK_STATS.setdefault(name, {"acquisitions": 0, "contended": 0, "wait_s": 0.0, "max_wait_s": 0.0})
+        stats["acquisitions"] += 1
+        stats["wait_s"] += waited
+        stats["max_wait_s"] = max(stats["max_wait_s"], waited)
+        if waited > 0.001:
+            stats["contended"] += 1
+
+@contextmanager
+def file_lock(path, shared=False):
+    # Re-entrant within a thread: nested file_lock calls on the same path
+    # (a compaction inside a write, say) reuse the outer lock
+    held = getattr(_held, "paths", None)
+    if held is None:
+        held = _held.paths = {}
+    if path in held:
+        held[path] += 1
+        try:
+            yield
+        finally:
+            held[path] -= 1
+        return
+
+    start = time.perf_counter()
+    local = _thread_lock(path)
+    local.acquire()
+    f = None
+    try:
+        if fcntl is not None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            f = open(path + LOCK_SUFFIX, "a")
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        _record_wait(os.path.basename(path), time.perf_counter() - start)
+        held[path] = 1
+        try:
+            yield
+        finally:
+            del held[path]
+    finally:
+        if f is not None:
+            f.close()
+        local.release()
+
+def _fsync_dir(path):
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def atomic_write(path, write, mode="wb", **open_kwargs):
+    # write(f) fills the open temporary file; the target is replaced only
+    # once everything is on disk
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp = os.path.join(directory, f".{os.path.basename(path)}.tmp{os.getpid()}.{threading.get_ident()}")
+    try:
+        with open(tmp, mode, **open_kwargs) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    _fsync_dir(path)
+
+def write_csv(df, path):
+    atomic_write(path, lambda f: df.to_csv(f, index=False), mode="w", newline="", encoding="utf-8")
+
+def lock_stats():
+    # {lock name: acquisitions, contended, wait_s, max_wait_s, avg_wait_ms}
+    with _stats_lock:
+        stats = {name: dict(s) for name, s in LOCK_STATS.items()}
+    for s in stats.values():
+        s["avg_wait_ms"] = 1000 * s["wait_s"] / s["acquisitions"] if s["acquisitions"] else 0.0
+    return stats
@@ -1,4 +1,3 @@
-import os
 import dash
 import pandas as pd
 import json
@@ -6,21 +5,20 @@ from dash import html, dcc, Input, Output, State
 from dash.dependencies import ALL
 from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
+from modules.repository import TABLES, delete_row, get_row, insert_row, read_table, table_exists, update_row, write_table
 
 # ------------------ Config ------------------
-NOTIF_CSV_PATH = "data/notification.csv"
+NOTIF_CSV_PATH = TABLES["notifications"].path
 BLUE = "#2f80ed"
 
-# ------------------ CSV Read / Write ------------------
+# ------------------ Read / Write ------------------
 def read_notifications():
-    if os.path.exists(NOTIF_CSV_PATH):
-        df = pd.read_csv(NOTIF_CSV_PATH)
-        df["delivered"] = df["delivered"].apply(lambda x: True if str(x).lower() == "true" else False)
-        return df
+    if table_exists("notifications"):
+        return read_table("notifications")
     return pd.DataFrame(columns=["id", "user_id", "message", "delivered"])
 
 def save_notifications(df):
-    df.to_csv(NOTIF_CSV_PATH, index=False)
+    write_table("notifications", df)
 
 # ------------------ Table ------------------
 def generate_notifications_table(df, user_role="student"):
@@ -163,11 +161,9 @@ def register_notifications_callbacks(app):
         ctx = dash.callback_context
         notif_id = eval(ctx.triggered[0]["prop_id"].split(".")[0])["index"]
 
-        df = read_notifications()
-        df = df[df.id != notif_id]
-        save_notifications(df)
+        delete_row("notifications", notif_id)
 
-        return generate_notifications_table(df, user_role)
+        return generate_notifications_table(read_notifications(), user_role)
 
     # ------------------ Edit / Reset ------------------
     @app.callback(
@@ -196,9 +192,8 @@ def register_notifications_callbacks(app):
             return None, "", None, "Add", None
 
         notif_id = eval(trigger.split(".")[0])["index"]
-        df = read_notifications()
-        r = df[df.id == notif_id].iloc[0]
-        return r.user_id, r.message, r.delivered, "Update", notif_id
+        r = get_row("notifications", notif_id)
+        return r["user_id"], r["message"], str(r["delivered"]).lower() == "true", "Update", notif_id
 
     # ------------------ Add / Update ------------------
     @app.callback(
@@ -217,15 +212,13 @@ def register_notifications_callbacks(app):
         if user_role != "admin" or user_id is None or not message or delivered is None:
             raise PreventUpdate
 
-        df = read_notifications()
+        notification = {"user_id": user_id, "message": message, "delivered": delivered}
         if edit_id is not None:
-            df.loc[df.id == edit_id, ["user_id", "message", "delivered"]] = [user_id, message, delivered]
+            update_row("notifications", edit_id, notification)
         else:
-            new_id = int(df.id.max()) + 1 if not df.empty else 1
-            df = pd.concat([df, pd.DataFrame([{"id": new_id, "user_id": user_id, "message": message, "delivered": delivered}])], ignore_index=True)
+            insert_row("notifications", notification)
 
-        save_notifications(df)
-        return generate_notifications_table(df, user_role)
+        return generate_notifications_table(read_notifications(), user_role)
 
     # ------------------ Search ------------------
     @app.callback(
@@ -0,0 +1,149 @@
+import time
+import numpy as np
+
+from modules.route_engine import ACCESSIBLE, shortest_path_tree
+
+# Visiting order for a multi-stop trip (open-day tours, maintenance rounds).
+# The pairwise distances between the stops come from one truncated
+# shortest-path tree per stop (or straight from a distance table when one
+# is loaded); the order is built nearest-neighbour first and then improved
+# with 2-opt and Or-opt moves until no move helps or the time budget runs
+# out. The first stop is always where the tour starts.
+
+TOUR_TIME_BUDGET = 0.5      # seconds of 2-opt / Or-opt improvement
+OR_OPT_SEGMENT = 3          # longest run of stops Or-opt moves at once
+IMPROVEMENT_EPS = 1e-9
+
+# ---------------- Distance Matrix ----------------
+def tree_matrix(graph, stops):
+    # (k, k) distances plus a leg(i, j) -> (dist, path, access_flags)
+    # function, from one tree per stop that stops once all stops are settled
+    ids = [graph.index[s] for s in stops]
+    trees = [shortest_path_tree(graph, s, until=ids) for s in ids]
+    matrix = np.array([[tree[0].get(t, np.inf) for t in ids] for tree in trees])
+    np.fill_diagonal(matrix, 0.0)
+
+    def leg(i, j):
+        dist, pred = trees[i]
+        nodes, flags = [ids[j]], []
+        while nodes[-1] != ids[i]:
+            u, e = pred[nodes[-1]]
+            flags.append(bool(graph.flags[e] & ACCESSIBLE))
+            nodes.append(u)
+        return float(matrix[i, j]), [graph.names[v] for v in reversed(nodes)], flags[::-1]
+    return matrix, leg
+
+def table_matrix(table, stops):
+    ids = [table.index[s] for s in stops]
+    matrix = np.array(table.dist[np.ix_(ids, ids)], dtype=np.float64)
+    return matrix, lambda i, j: table.shortest_path(stops[i], stops[j])
+
+# ---------------- Ordering ----------------
+def _nearest_neighbour(matrix):
+    order = [0]
+    left = set(range(1, len(matrix)))
+    while left:
+        last = order[-1]
+        nxt = min(left, key=lambda j: matrix[last, j])
+        order.append(nxt)
+        left.remove(nxt)
+    return order
+
+def tour_length(matrix, order, closed=False):
+    length = sum(matrix[a, b] for a, b in zip(order, order[1:]))
+    return length + (matrix[order[-1], order[0]] if closed and len(order) > 1 else 0.0)
+
+def _two_opt(matrix, order, closed):
+    # Reverse order[i..j]; distances are symmetric so only the two end
+    # edges change. Returns True after applying the first improving move.
+    k = len(order)
+    for i in range(1, k - 1):
+        a, b = order[i - 1], order[i]
+        for j in range(i + 1, k):
+            c = order[j]
+            d = order[j + 1] if j + 1 < k else (order[0] if closed else None)
+            before = matrix[a, b] + (matrix[c, d] if d is not None else 0.0)
+            after = matrix[a, c] + (matrix[b, d] if d is not None else 0.0)
+            if after < before - IMPROVEMENT_EPS:
+                order[i:j + 1] = order[i:j + 1][::-1]
+                return True
+    return False
+
+def _or_opt(matrix, order, closed):
+    # Move a run of 1..OR_OPT_SEGMENT stops (possibly reversed) to another
+    # gap of the tour
+    k = len(order)
+
+    def cost(a, b):
+        return matrix[a, b] if a is not None and b is not None else 0.0
+
+    for length in range(1, min(OR_OPT_SEGMENT, k - 2) + 1):
+        for i in range(1, k - length + 1):
+            segment = order[i:i + length]
+            prev = order[i - 1]
+            nxt = order[i + length] if i + length < k else (order[0] if closed else None)
+            removed = cost(prev, segment[0]) + cost(segment[-1], nxt) - cost(prev, nxt)
+            rest = order[:i] + order[i + length:]
+            for p in range(len(rest)):
+                a = rest[p]
+                b = rest[p + 1] if p + 1 < len(rest) else (rest[0] if closed else None)
+                for run in (segment, segment[::-1]):
+                    if p == i - 1 and run is segment:
+                        continue
+                    added = cost(a, run[0]) + cost(run[-1], b) - cost(a, b)
+                    if added < removed - IMPROVEMENT_EPS:
+                        order[:] = rest[:p + 1] + run + rest[p + 1:]
+                        return True
+    return False
+
+def solve_order(matrix, closed=False, time_budget=TOUR_TIME_BUDGET):
+    # Visiting order (indices into matrix, starting with 0) and its length
+    order = _nearest_neighbour(matrix)
+    deadline = time.monotonic() + time_budget
+    while time.monotonic() < deadline:
+        if not (_two_opt(matrix, order, closed) or _or_opt(matrix, order, closed)):
+            break
+    return order, tour_length(matrix, order, closed)
+
+# ---------------- Tour ----------------
+def plan_tour(graph, stops, closed=False, table=None, time_budget=TOUR_TIME_BUDGET):
+    # Returns a dict with the ordered stops, total distance, the legs as
+    # (from, to, dist, path, access_flags), the full path and its flags,
+    # and the stops that are unknown or cannot be reached from the first
+    # one (those are left out of the tour)
+    stops = list(dict.fromkeys(stops))
+    unknown = [s for s in stops if s not in graph]
+    stops = [s for s in stops if s in graph]
+    empty = {"order": stops[:1], "distance": 0.0, "legs": [], "path": stops[:1], "access_flags": [], "unreachable": unknown}
+    if len(stops) < 2:
+        return empty
+
+    if table is not None and all(s in table.index for s in stops):
+        matrix, leg = table_matrix(table, stops)
+    else:
+        matrix, leg = tree_matrix(graph, stops)
+
+    reachable = [i for i in range(len(stops)) if np.isfinite(matrix[0, i])]
+    unreachable = unknown + [stops[i] for i in range(len(stops)) if not np.isfinite(matrix[0, i])]
+    if len(reachable) < 2:
+        return dict(empty, unreachable=unreachable)
+
+    order, distance = solve_order(matrix[np.ix_(reachable, reachable)], closed, time_budget)
+    order = [reachable[i] for i in order]
+    if closed:
+        order.append(order[0])
+
+    legs, path, access_flags = [], [stops[order[0]]], []
+    for i, j in zip(order, order[1:]):
+        dist, leg_path, leg_flags = leg(i, j)
+        legs.append((stops[i], stops[j], dist, leg_path, leg_flags))
+        path.extend(leg_path[1:])
+        access_flags.extend(leg_flags)
+    return {
+        "order": [stops[i] for i in order],
+        "distance": float(distance),
+        "legs": legs,
+        "path": path,
+        "access_flags": access_flags,
+        "unreachable": unreachable,
+    }
@@ -2,7 +2,6 @@ import dash
 import dash_bootstrap_components as dbc
 from dash import html, dcc
 from dash.dependencies import Input, Output, State
-import csv
 import json
 
 from modules.auth import login_layout
@@ -13,6 +12,7 @@ from modules.system_alerts import notifications_layout, register_notifications_c
 from modules.route_configuration import routes_layout, register_routes_callbacks
 from modules.path_optimizer import layout as find_routes_layout, register_find_routes_callbacks
 from modules.analytics_dashboard import reports_layout, register_reports_callbacks
+from modules.repository import read_records, table_exists
 
 app = dash.Dash(
     __name__,
@@ -32,10 +32,8 @@ app.layout = html.Div([
 
 def read_users():
     try:
-        with open("data/users.csv", "r", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            return list(reader)
-    except FileNotFoundError:
+        if table_exists("users"):
+            return read_records("users")
         return [
             {"username": "admin", "password": "1234", "role": "admin"},
             {"username": "user1", "password": "abcd", "role": "user"},
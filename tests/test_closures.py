@@ -0,0 +1,47 @@
+from datetime import datetime
+
+import pandas as pd
+
+from modules.closures import CLOSURE_COLUMNS, ClosureSchedule, shortest_path_at
+from modules.route_engine import RouteGraph
+
+# Run from the repository root:
+#   python -m pytest tests
+
+DEPARTURE = datetime(2026, 5, 1, 10, 0)
+
+def detour_graph():
+    # S-U-T is short; S-X-U is a long way round to U
+    routes = pd.DataFrame({
+        "id": [1, 2, 3, 4],
+        "start_location": ["S", "S", "X", "U"],
+        "end_location": ["U", "X", "U", "T"],
+        "distance_m": [10.0, 100.0, 100.0, 10.0],
+        "accessible": [True, True, True, True],
+    })
+    return RouteGraph.from_frame(routes, collapse=False)
+
+def schedule(*rows):
+    return ClosureSchedule(pd.DataFrame([dict(zip(CLOSURE_COLUMNS, row)) for row in rows], columns=CLOSURE_COLUMNS))
+
+def test_waits_for_route_closure_to_end():
+    # U-T is closed when the walker first reaches U; reaching U later (via
+    # X) or waiting there both get through once it reopens, so there is a
+    # route, and waiting at U is the earliest arrival
+    closures = schedule((1, "route", "4", "2026-05-01 10:00", "2026-05-01 10:01", "", "Cleaning"))
+    stats = {}
+    dist, path, _ = shortest_path_at(detour_graph(), "S", "T", DEPARTURE, closures, stats=stats)
+    assert path == ["S", "U", "T"]
+    assert dist == 20.0
+    assert abs(stats["wait_s"] - (60 - 10 / 1.4)) < 1e-6
+
+def test_no_waiting_when_open():
+    stats = {}
+    dist, path, _ = shortest_path_at(detour_graph(), "S", "T", DEPARTURE, schedule(), stats=stats)
+    assert (dist, path) == (20.0, ["S", "U", "T"])
+    assert stats["wait_s"] == 0.0
+
+def test_no_route_through_location_closed_all_day():
+    # U is shut around the clock: no amount of waiting helps
+    closures = schedule((1, "location", "U", "00:00", "00:00", "", "Renovation"))
+    assert shortest_path_at(detour_graph(), "S", "T", DEPARTURE, closures) == (None, [], [])
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from modules.route_engine import RouteGraph, pareto_routes
+
+# Run from the repository root:
+#   python -m pytest tests
+
+def floors_graph():
+    # S-L-T is short but climbs two floors (stairs on L-T); S-M-T is longer
+    # and stays on one floor; S-N-T is longer than S-L-T and climbs as much
+    routes = pd.DataFrame({
+        "id": [1, 2, 3, 4, 5, 6],
+        "start_location": ["S", "L", "S", "M", "S", "N"],
+        "end_location": ["L", "T", "M", "T", "N", "T"],
+        "distance_m": [10.0, 10.0, 30.0, 30.0, 40.0, 40.0],
+        "accessible": [True, True, True, True, True, True],
+    })
+    climbs = {1: 0, 2: 2, 3: 0, 4: 0, 5: 0, 6: 2}
+    graph = RouteGraph.from_frame(routes, collapse=False)
+    return graph, np.array([climbs[rid] for rid in graph.route_ids.tolist()], dtype=np.int64)
+
+def test_front_keeps_short_climb_and_long_level_routes():
+    graph, floor_changes = floors_graph()
+    routes = pareto_routes(graph, "S", "T", floor_changes)
+    front = [(dist, path, climbed) for dist, path, _, climbed in routes]
+    assert front == [(20.0, ["S", "L", "T"], 2), (60.0, ["S", "M", "T"], 0)]
+
+def test_dominated_route_is_not_on_front():
+    graph, floor_changes = floors_graph()
+    paths = [path for _, path, _, _ in pareto_routes(graph, "S", "T", floor_changes)]
+    assert ["S", "N", "T"] not in paths
+
+def test_without_floor_changes_only_shortest_remains():
+    graph, _ = floors_graph()
+    routes = pareto_routes(graph, "S", "T")
+    assert [(dist, path) for dist, path, _, _ in routes] == [(20.0, ["S", "L", "T"])]